@@ -0,0 +1,353 @@
+import dataclasses
+import datetime
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from config.config import ANALYTICS_DIR
+from geo import from_xyz, great_circle_nm, to_xyz, unwrap_lon, wrap_lon
+from models import ModelTrackError, StormAnalytics, StormForecast, StormForecasts
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Common forecast hour grid every model track is interpolated onto
+FHR_GRID = np.arange(0, 121, 6)
+
+# Analytics are immutable once computed, keyed by (storm_id, cycle, members)
+_ANALYTICS_CACHE: dict[tuple[str, str, str], StormAnalytics] = {}
+
+
+@dataclass
+class StormInputs:
+    storm_id: str
+    # Latest track per model, as returned by plot.get_my_recent_forecasts
+    forecasts: StormForecasts
+    # Observed history, as returned by plot.tropycal_to_df
+    history_df: pd.DataFrame
+    # All cycles per model: tropycal get_operational_forecasts()
+    all_forecasts: dict
+
+
+def forecast_init(forecast: StormForecast) -> datetime.datetime:
+    return datetime.datetime.combine(
+        forecast.forecast_date, datetime.time(hour=int(forecast.forecast_hour))
+    )
+
+
+def get_cycle(forecasts: StormForecasts) -> str:
+    """Most recent forecast cycle as YYYYMMDDHH, used as the analytics cache key."""
+    if len(forecasts.forecasts) == 0:
+        return ""
+    latest = max(forecast_init(x) for x in forecasts.forecasts)
+    return latest.strftime("%Y%m%d%H")
+
+
+def get_members(forecasts: StormForecasts) -> str:
+    """Digest of the member models and their cycles, part of the cache key.
+
+    HAFS, or a model's newer cycle, can arrive after the latest cycle was
+    already computed from the other models.
+    """
+    members = sorted(
+        f"{x.model_id}.{forecast_init(x):%Y%m%d%H}"
+        for x in forecasts.forecasts
+        if not x.dataframe.empty
+    )
+    return hashlib.sha1(",".join(members).encode("utf-8")).hexdigest()[:12]
+
+
+def interpolate_track(
+    fhr: np.ndarray, lat: np.ndarray, lon: np.ndarray, wind: np.ndarray
+) -> np.ndarray:
+    """Interpolate one track onto FHR_GRID, returns array of shape (3, len(FHR_GRID)).
+
+    Hours outside the forecast range are NaN so they drop out of the consensus.
+    """
+    out = np.full((3, len(FHR_GRID)), np.nan)
+    fhr = np.asarray(fhr, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    wind = np.asarray(wind, dtype=float)
+    valid = ~(np.isnan(fhr) | np.isnan(lat) | np.isnan(lon))
+    if valid.sum() == 0:
+        return out
+    order = np.argsort(fhr[valid])
+    fhr, lat, lon, wind = (x[valid][order] for x in (fhr, lat, lon, wind))
+    lon = unwrap_lon(lon)
+    out[0] = np.interp(FHR_GRID, fhr, lat, left=np.nan, right=np.nan)
+    out[1] = wrap_lon(np.interp(FHR_GRID, fhr, lon, left=np.nan, right=np.nan))
+    has_wind = ~np.isnan(wind)
+    if has_wind.sum() > 0:
+        out[2] = np.interp(
+            FHR_GRID, fhr[has_wind], wind[has_wind], left=np.nan, right=np.nan
+        )
+    return out
+
+
+def _to_list(values: np.ndarray) -> list:
+    """JSON friendly list, NaN becomes None."""
+    return [None if np.isnan(x) else round(float(x), 2) for x in values]
+
+
+def compute_consensus(
+    tracks: np.ndarray, storm_idx: np.ndarray, n_storms: int
+) -> dict[str, np.ndarray]:
+    """Consensus, spread and intensity envelope for every storm at once.
+
+    tracks is (n_tracks, 3, n_fhr) of lat, lon, wind and storm_idx maps each track
+    to its storm. Positions are averaged as unit vectors so tracks either side of
+    the antimeridian average correctly.
+    """
+    n_fhr = tracks.shape[2]
+    lats, lons, winds = tracks[:, 0], tracks[:, 1], tracks[:, 2]
+    has_pos = ~(np.isnan(lats) | np.isnan(lons))
+    has_wind = ~np.isnan(winds)
+
+    xyz = np.where(has_pos[..., None], to_xyz(lats, lons), 0)
+    xyz_sum = np.zeros((n_storms, n_fhr, 3))
+    np.add.at(xyz_sum, storm_idx, xyz)
+    members = np.zeros((n_storms, n_fhr), dtype=int)
+    np.add.at(members, storm_idx, has_pos.astype(int))
+
+    wind_sum = np.zeros((n_storms, n_fhr))
+    np.add.at(wind_sum, storm_idx, np.where(has_wind, winds, 0))
+    wind_count = np.zeros((n_storms, n_fhr))
+    np.add.at(wind_count, storm_idx, has_wind.astype(int))
+    wind_min = np.full((n_storms, n_fhr), np.inf)
+    np.fmin.at(wind_min, storm_idx, winds)
+    wind_max = np.full((n_storms, n_fhr), -np.inf)
+    np.fmax.at(wind_max, storm_idx, winds)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        consensus_lat, consensus_lon = from_xyz(xyz_sum)
+        consensus_lat = np.where(members > 0, consensus_lat, np.nan)
+        consensus_lon = np.where(members > 0, consensus_lon, np.nan)
+        consensus_wind = np.where(wind_count > 0, wind_sum / wind_count, np.nan)
+
+        dist = great_circle_nm(
+            lats, lons, consensus_lat[storm_idx], consensus_lon[storm_idx]
+        )
+        dist_sum = np.zeros((n_storms, n_fhr))
+        np.add.at(dist_sum, storm_idx, np.where(has_pos, dist, 0))
+        spread = np.where(members > 0, dist_sum / members, np.nan)
+
+    return {
+        "lat": consensus_lat,
+        "lon": consensus_lon,
+        "wind": consensus_wind,
+        "spread": spread,
+        "wind_min": np.where(np.isfinite(wind_min), wind_min, np.nan),
+        "wind_max": np.where(np.isfinite(wind_max), wind_max, np.nan),
+        "members": members,
+    }
+
+
+def compute_track_errors(
+    storms: list[StormInputs],
+) -> dict[str, list[ModelTrackError]]:
+    """Mean great circle error of every past cycle of every model vs observed track.
+
+    All forecast points of all storms are flattened into one vector, matched to
+    the observed position at their valid time and binned by (storm, model, fhr).
+    """
+    point_group = []
+    point_fhr = []
+    point_valid = []
+    point_lat = []
+    point_lon = []
+    groups: list[tuple[int, str]] = []
+    obs_tracks = []
+    for i, storm in enumerate(storms):
+        hist = storm.history_df.dropna(subset=["lat", "lon"]).sort_values("time")
+        obs_time = hist["time"].to_numpy(dtype="datetime64[s]").astype(float)
+        obs_tracks.append((obs_time, hist["lat"].to_numpy(), hist["lon"].to_numpy()))
+        for model_id, cycles in storm.all_forecasts.items():
+            groups.append((i, model_id))
+            group_id = len(groups) - 1
+            for cycle, forecast in cycles.items():
+                init = datetime.datetime.strptime(cycle, "%Y%m%d%H")
+                fhr = np.asarray(forecast["fhr"], dtype=float)
+                point_group.append(np.full(len(fhr), group_id))
+                point_fhr.append(fhr)
+                point_valid.append(np.datetime64(init, "s").astype(float) + fhr * 3600)
+                point_lat.append(np.asarray(forecast["lat"], dtype=float))
+                point_lon.append(np.asarray(forecast["lon"], dtype=float))
+
+    errors: dict[str, list[ModelTrackError]] = {x.storm_id: [] for x in storms}
+    if len(point_group) == 0:
+        return errors
+
+    group = np.concatenate(point_group)
+    fhr = np.concatenate(point_fhr)
+    valid = np.concatenate(point_valid)
+    lat = np.concatenate(point_lat)
+    lon = np.concatenate(point_lon)
+    storm_of_group = np.array([x[0] for x in groups])
+
+    # Observed position at each valid time, NaN once past the last observation
+    obs_lat = np.full(len(group), np.nan)
+    obs_lon = np.full(len(group), np.nan)
+    point_storm = storm_of_group[group]
+    for i, (obs_time, lats, lons) in enumerate(obs_tracks):
+        if len(obs_time) == 0:
+            continue
+        mask = point_storm == i
+        obs_lat[mask] = np.interp(
+            valid[mask], obs_time, lats, left=np.nan, right=np.nan
+        )
+        obs_lon[mask] = wrap_lon(
+            np.interp(
+                valid[mask], obs_time, unwrap_lon(lons), left=np.nan, right=np.nan
+            )
+        )
+
+    err = great_circle_nm(lat, lon, obs_lat, obs_lon)
+    lead_idx = np.clip(np.searchsorted(FHR_GRID, fhr), 0, len(FHR_GRID) - 1)
+    usable = ~np.isnan(err) & (FHR_GRID[lead_idx] == fhr)
+
+    err_sum = np.zeros((len(groups), len(FHR_GRID)))
+    np.add.at(err_sum, (group[usable], lead_idx[usable]), err[usable])
+    err_count = np.zeros((len(groups), len(FHR_GRID)), dtype=int)
+    np.add.at(err_count, (group[usable], lead_idx[usable]), 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        err_mean = np.where(err_count > 0, err_sum / err_count, np.nan)
+
+    for group_id, (storm_i, model_id) in enumerate(groups):
+        if err_count[group_id].sum() == 0:
+            continue
+        errors[storms[storm_i].storm_id].append(
+            ModelTrackError(
+                model_id=model_id,
+                fhr=FHR_GRID.tolist(),
+                mean_error_nm=_to_list(err_mean[group_id]),
+                cycle_count=err_count[group_id].tolist(),
+            )
+        )
+    return errors
+
+
+def compute_storms_analytics(storms: list[StormInputs]) -> dict[str, StormAnalytics]:
+    """Compute analytics for all storms and models in one batched pass.
+
+    Storms whose cycle was already computed are served from the cache.
+    """
+    results: dict[str, StormAnalytics] = {}
+    todo: list[StormInputs] = []
+    for storm in storms:
+        cached = load_cached_analytics(
+            storm.storm_id, get_cycle(storm.forecasts), get_members(storm.forecasts)
+        )
+        if cached is not None:
+            results[storm.storm_id] = cached
+        else:
+            todo.append(storm)
+
+    if len(todo) == 0:
+        return results
+
+    tracks = []
+    storm_idx = []
+    models: list[list[str]] = [[] for _ in todo]
+    for i, storm in enumerate(todo):
+        for forecast in storm.forecasts.forecasts:
+            df = forecast.dataframe
+            if df.empty:
+                continue
+            tracks.append(
+                interpolate_track(df["fhr"], df["lat"], df["lon"], df["wind_kt"])
+            )
+            storm_idx.append(i)
+            models[i].append(forecast.model_id)
+
+    n_fhr = len(FHR_GRID)
+    if len(tracks) > 0:
+        consensus = compute_consensus(np.stack(tracks), np.array(storm_idx), len(todo))
+    else:
+        empty = np.full((len(todo), n_fhr), np.nan)
+        consensus = {
+            key: empty
+            for key in ["lat", "lon", "wind", "spread", "wind_min", "wind_max"]
+        }
+        consensus["members"] = np.zeros((len(todo), n_fhr), dtype=int)
+
+    track_errors = compute_track_errors(todo)
+
+    for i, storm in enumerate(todo):
+        storm_analytics = StormAnalytics(
+            storm_id=storm.storm_id,
+            cycle=get_cycle(storm.forecasts),
+            fhr=FHR_GRID.tolist(),
+            models=models[i],
+            consensus_lat=_to_list(consensus["lat"][i]),
+            consensus_lon=_to_list(consensus["lon"][i]),
+            consensus_wind_kt=_to_list(consensus["wind"][i]),
+            spread_nm=_to_list(consensus["spread"][i]),
+            wind_min_kt=_to_list(consensus["wind_min"][i]),
+            wind_max_kt=_to_list(consensus["wind_max"][i]),
+            member_count=consensus["members"][i].tolist(),
+            track_errors=track_errors[storm.storm_id],
+        )
+        save_cached_analytics(storm_analytics, get_members(storm.forecasts))
+        results[storm.storm_id] = storm_analytics
+    logger.info(f"computed analytics for {len(todo)} storms, {len(tracks)} tracks")
+    return results
+
+
+def analytics_to_json(storm_analytics: StormAnalytics) -> str:
+    return json.dumps(dataclasses.asdict(storm_analytics))
+
+
+def analytics_from_json(data: str) -> StormAnalytics:
+    mydict = json.loads(data)
+    mydict["track_errors"] = [ModelTrackError(**x) for x in mydict["track_errors"]]
+    return StormAnalytics(**mydict)
+
+
+def _cache_path(storm_id: str, cycle: str, members: str) -> str:
+    return f"{ANALYTICS_DIR}/{storm_id}_{cycle}_{members}.json"
+
+
+def load_cached_analytics(
+    storm_id: str, cycle: str, members: str
+) -> StormAnalytics | None:
+    if not cycle:
+        return None
+    key = (storm_id, cycle, members)
+    if key in _ANALYTICS_CACHE:
+        return _ANALYTICS_CACHE[key]
+    path = _cache_path(storm_id, cycle, members)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file_r:
+        storm_analytics = analytics_from_json(file_r.read())
+    _ANALYTICS_CACHE[key] = storm_analytics
+    return storm_analytics
+
+
+def save_cached_analytics(storm_analytics: StormAnalytics, members: str) -> None:
+    if not storm_analytics.cycle:
+        return
+    key = (storm_analytics.storm_id, storm_analytics.cycle, members)
+    _ANALYTICS_CACHE[key] = storm_analytics
+    os.makedirs(ANALYTICS_DIR, exist_ok=True)
+    with open(_cache_path(*key), "w") as f:
+        f.write(analytics_to_json(storm_analytics))
+
+
+def write_analytics(
+    my_dir: str, storm_id: str, storm_analytics: StormAnalytics | None, **kwargs: Any
+) -> None:
+    """Save a storm's analytics next to its images for the API."""
+    if storm_analytics is None:
+        logger.warning(f"{storm_id} no analytics to write")
+        return
+    with open(f"{my_dir}/{storm_id}/analytics.json", "w") as file_w:
+        file_w.write(analytics_to_json(storm_analytics))
@@ -1,35 +1,59 @@
+import dataclasses
 import datetime
+import gzip
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Annotated, Any
 
 from litestar import Controller, Response, get
+from litestar.exceptions import NotFoundException, ValidationException
+from litestar.params import Parameter
 
-from api_app.models import Storm, Storms
+from api_app.models import IMAGE_TYPES, Storm, Storms
+from catalog import query_storms
 from config.config import IMAGES_DIR
+from notify import ChangeListener
+from profiling import sampled_in_thread
+from publish import (
+    BATCH_INDEX_PATH,
+    STORMS_INDEX_PATH,
+    get_most_recent_storm_dirs,
+    get_storm_version,
+    read_generation,
+)
+from retention import read_archived_file
+from tiles import MAX_ZOOM, get_tile, is_valid_tile
 
 """
 /storms/{storm_id} a specific article
 /storms/ all storms?
 """
 
+IfNoneMatchHeader = Annotated[str | None, Parameter(header="If-None-Match")]
 
-def get_string_date_from_days_ago(days: int) -> str:
-    mydate = datetime.datetime.utcnow() - datetime.timedelta(days=days)
-    mydate_str = mydate.strftime("%Y-%m-%d")
-    return mydate_str
+# Recently served storm files, (date, storm, filename) -> (version, bytes)
+_FILE_CACHE: OrderedDict[tuple[str, str, str], tuple[str, bytes]] = OrderedDict()
+FILE_CACHE_SIZE = 256
+# Async and sync_to_thread handlers share the caches, reorders must not interleave
+_FILE_CACHE_LOCK = threading.Lock()
 
+# Publishes announced by the scraper, used to evict _FILE_CACHE entries, and
+# the publish counter, to notice publishes whose announce failed
+_CHANGES = ChangeListener(read_generation=read_generation)
 
-def get_most_recent_storm_dirs() -> tuple[str, list[str]]:
-    storm_dirs: list = []
-    i = 0
-    while len(storm_dirs) == 0 and i <= 5:
-        date_str = get_string_date_from_days_ago(i)
-        if date_str in os.listdir(IMAGES_DIR):
-            storm_dirs = os.listdir(f"{IMAGES_DIR}/{date_str}")
-            print(f"{date_str=} found {len(storm_dirs)} directories")
-        else:
-            print(f"{date_str=} found no directories")
-        i += 1
-    return date_str, storm_dirs
+# Precomputed bodies by path then content encoding, reloaded when republished
+_PRECOMPUTED: dict[str, dict[str, Any]] = {}
+
+# Batch fields clients can select, storm metadata is always included
+BATCH_FIELDS = ("history", "official", "forecasts")
+# Filtered batch bodies, (etag, fields, models, history_points) -> (etag, bodies)
+_BATCH_SELECTIONS: OrderedDict[tuple, tuple[str, dict[str, bytes]]] = OrderedDict()
+BATCH_SELECTIONS_SIZE = 64
+_BATCH_SELECTIONS_LOCK = threading.Lock()
 
 
 def get_storm_images(date_str: str, storm_id: str) -> tuple[str, list[str]]:
@@ -37,104 +61,567 @@ def get_storm_images(date_str: str, storm_id: str) -> tuple[str, list[str]]:
     return date_str, storm_dirs
 
 
+def load_precomputed(path: str) -> dict[str, Any] | None:
+    """ETag and encoded bodies of a body precomputed at publish, None if missing."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    state = _PRECOMPUTED.get(path)
+    if state is None or state["mtime_ns"] != mtime_ns:
+        bodies = {}
+        for encoding, suffix in [("identity", ""), ("gzip", ".gz"), ("br", ".br")]:
+            try:
+                with open(f"{path}{suffix}", "rb") as file_r:
+                    bodies[encoding] = file_r.read()
+            except FileNotFoundError:
+                continue
+        etag = hashlib.sha1(bodies["identity"]).hexdigest()[:16]
+        state = {"mtime_ns": mtime_ns, "etag": f'"{etag}"', "bodies": bodies}
+        _PRECOMPUTED[path] = state
+    return state
+
+
+def encoded_response(
+    etag: str,
+    bodies: dict[str, bytes],
+    if_none_match: str | None,
+    accept_encoding: str | None,
+) -> Response[bytes]:
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if if_none_match == etag:
+        return Response(
+            b"", status_code=304, headers=headers, media_type="application/json"
+        )
+    encoding = choose_encoding(accept_encoding, bodies)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(bodies[encoding], headers=headers, media_type="application/json")
+
+
+def select_batch(
+    batch: dict[str, Any],
+    fields: set[str],
+    models: set[str] | None,
+    history_points: int | None,
+) -> dict[str, Any]:
+    """Batch with only the given fields, models and last history points."""
+    storms = []
+    for storm in batch["storms"]:
+        selected = {k: v for k, v in storm.items() if k not in BATCH_FIELDS}
+        for field in BATCH_FIELDS:
+            if field not in fields or field not in storm:
+                continue
+            value = storm[field]
+            if field == "forecasts" and models is not None:
+                value = {k: v for k, v in value.items() if k in models}
+            if field == "history" and history_points is not None:
+                value = {k: v[-history_points:] for k, v in value.items()}
+            selected[field] = value
+        storms.append(selected)
+    return {"storms": storms}
+
+
+def get_batch_selection(
+    state: dict[str, Any],
+    fields: set[str],
+    models: set[str] | None,
+    history_points: int | None,
+) -> tuple[str, dict[str, bytes]]:
+    """Encoded filtered batch, built once per publish and selection."""
+    key = (
+        state["etag"],
+        tuple(sorted(fields)),
+        None if models is None else tuple(sorted(models)),
+        history_points,
+    )
+    with _BATCH_SELECTIONS_LOCK:
+        cached = _BATCH_SELECTIONS.get(key)
+        if cached is not None:
+            _BATCH_SELECTIONS.move_to_end(key)
+            return cached
+
+    if "parsed" not in state:
+        state["parsed"] = json.loads(state["bodies"]["identity"])
+    body = json.dumps(
+        select_batch(state["parsed"], fields, models, history_points),
+        separators=(",", ":"),
+    ).encode("utf-8")
+    etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+    cached = (etag, {"identity": body, "gzip": gzip.compress(body, 6)})
+    with _BATCH_SELECTIONS_LOCK:
+        _BATCH_SELECTIONS[key] = cached
+        if len(_BATCH_SELECTIONS) > BATCH_SELECTIONS_SIZE:
+            _BATCH_SELECTIONS.popitem(last=False)
+    return cached
+
+
+def choose_encoding(accept_encoding: str | None, available: dict[str, bytes]) -> str:
+    accepted = {
+        x.split(";")[0].strip().lower() for x in (accept_encoding or "").split(",")
+    }
+    for encoding in ["br", "gzip"]:
+        if encoding in accepted and encoding in available:
+            return encoding
+    return "identity"
+
+
+def evict_changed_files() -> None:
+    """Drop cached files of storms the scraper has published since the last poll."""
+    changes = _CHANGES.poll()
+    with _FILE_CACHE_LOCK:
+        if changes is None:
+            _FILE_CACHE.clear()
+            return
+        for change in changes:
+            for filename in change.filenames:
+                _FILE_CACHE.pop((change.date_str, change.storm_id, filename), None)
+
+
+def read_storm_file(date_str: str, storm_id: str, filename: str) -> tuple[str, bytes]:
+    """Read a storm file and its version, falling back to the day archive.
+
+    Cached bytes are served until the scraper announces a new version of the
+    storm. Without the change table the storm link is checked on every read.
+    A read that races a publish is returned but not cached.
+    """
+    key = (date_str, storm_id, filename)
+    evict_changed_files()
+    with _FILE_CACHE_LOCK:
+        cached = _FILE_CACHE.get(key)
+        if cached is not None and _CHANGES.is_current:
+            _FILE_CACHE.move_to_end(key)
+            return cached
+
+    # Change id this read started from, a publish announced after it may
+    # evict the key before this read is cached
+    seen_change = _CHANGES.last_id
+    published_version = version = get_storm_version(date_str, storm_id)
+    if cached is not None and version is not None and cached[0] == version:
+        with _FILE_CACHE_LOCK:
+            if key in _FILE_CACHE:
+                _FILE_CACHE.move_to_end(key)
+        return cached
+
+    try:
+        with open(f"{IMAGES_DIR}/{date_str}/{storm_id}/{filename}", "rb") as file_r:
+            data = file_r.read()
+            if version is None:
+                # Storm directory from before versioned publishing
+                version = f"{storm_id}.{os.fstat(file_r.fileno()).st_mtime_ns}"
+    except FileNotFoundError:
+        archived = read_archived_file(date_str, storm_id, filename)
+        if archived is None:
+            raise NotFoundException(
+                f"{date_str}/{storm_id}/{filename} not found"
+            ) from None
+        version, data = f"archive.{date_str}.{storm_id}", archived
+
+    with _FILE_CACHE_LOCK:
+        if (
+            _CHANGES.last_id != seen_change
+            and get_storm_version(date_str, storm_id) != published_version
+        ):
+            # Republished meanwhile, caching this read would outlive the eviction
+            return version, data
+        _FILE_CACHE[key] = (version, data)
+        if len(_FILE_CACHE) > FILE_CACHE_SIZE:
+            _FILE_CACHE.popitem(last=False)
+    return version, data
+
+
+def storm_file_response(
+    date_str: str,
+    storm_id: str,
+    filename: str,
+    media_type: str,
+    if_none_match: str | None,
+) -> Response[bytes]:
+    version, data = read_storm_file(date_str, storm_id, filename)
+    headers = {"ETag": f'"{version}"', "Cache-Control": "public, max-age=60"}
+    if if_none_match == headers["ETag"]:
+        return Response(b"", status_code=304, headers=headers, media_type=media_type)
+    return Response(data, headers=headers, media_type=media_type)
+
+
 class StormController(Controller):
     path = "/api/storms"
 
     @get(path="/")
-    async def get_storms_list(self) -> Storms:
+    async def get_storms_list(
+        self,
+        if_none_match: IfNoneMatchHeader = None,
+        accept_encoding: Annotated[
+            str | None, Parameter(header="Accept-Encoding")
+        ] = None,
+    ) -> Response[bytes]:
         """
         Handles a GET request for a list of storms of a certain type.
 
         Args:
+            if_none_match (str): ETag the client already has.
+            accept_encoding (str): Encodings the client accepts.
 
         Returns:
-            Storms: A dictionary representation of the list of articles.
+            Storms: JSON list of storms with their image types, served from the
+            body precomputed at publish time in the best accepted encoding.
         """
-        date_str, storm_dirs = get_most_recent_storm_dirs()
+        storms_index = load_precomputed(STORMS_INDEX_PATH)
+        if storms_index is None:
+            # Nothing published yet with a precomputed list
+            date_str, storm_dirs = get_most_recent_storm_dirs()
+            mydict = Storms(
+                [Storm(id=mystorm, date=date_str) for mystorm in storm_dirs]
+            )
+            return Response(
+                json.dumps(dataclasses.asdict(mydict)).encode("utf-8"),
+                media_type="application/json",
+            )
+        return encoded_response(
+            storms_index["etag"],
+            storms_index["bodies"],
+            if_none_match,
+            accept_encoding,
+        )
+
+    @get(path="/batch", sync_to_thread=True)
+    @sampled_in_thread
+    def get_storms_batch(
+        self,
+        fields: str | None = None,
+        models: str | None = None,
+        history_points: Annotated[int | None, Parameter(ge=1)] = None,
+        if_none_match: IfNoneMatchHeader = None,
+        accept_encoding: Annotated[
+            str | None, Parameter(header="Accept-Encoding")
+        ] = None,
+    ) -> Response[bytes]:
+        """
+        Handles a GET request for every current storm's metadata and tracks.
 
-        mydict = Storms([Storm(id=mystorm, date=date_str) for mystorm in storm_dirs])
+        Args:
+            fields (str): Comma separated subset of history, official, forecasts.
+            models (str): Comma separated model ids to keep in forecasts.
+            history_points (int): Only the last N observed history points.
+            if_none_match (str): ETag the client already has.
+            accept_encoding (str): Encodings the client accepts.
+
+        Returns:
+            Bytes media type application/json, storms with tracks as packed
+            arrays. Built at publish time, selections are cached per publish.
+        """
+        state = load_precomputed(BATCH_INDEX_PATH)
+        if state is None:
+            return Response(b'{"storms":[]}', media_type="application/json")
+
+        selected_fields = set(BATCH_FIELDS)
+        if fields is not None:
+            selected_fields = {x.strip() for x in fields.split(",") if x.strip()}
+            unknown = selected_fields - set(BATCH_FIELDS)
+            if unknown:
+                raise ValidationException(
+                    f"unknown fields {sorted(unknown)}, choose from {BATCH_FIELDS}"
+                )
+        selected_models = None
+        if models is not None:
+            selected_models = {x.strip() for x in models.split(",") if x.strip()}
+
+        if (
+            selected_fields == set(BATCH_FIELDS)
+            and selected_models is None
+            and history_points is None
+        ):
+            etag, bodies = state["etag"], state["bodies"]
+        else:
+            etag, bodies = get_batch_selection(
+                state, selected_fields, selected_models, history_points
+            )
+        return encoded_response(etag, bodies, if_none_match, accept_encoding)
+
+    @get(path="/catalog", sync_to_thread=True)
+    @sampled_in_thread
+    def get_storms_catalog(
+        self,
+        basin: str | None = None,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+        hafs: bool | None = None,
+        limit: Annotated[int, Parameter(ge=1, le=1000)] = 100,
+    ) -> Storms:
+        """
+        Handles a GET request for cataloged storms matching the filters.
 
-        return mydict
+        Args:
+            basin (str): Basin code such as AL, EP or WP.
+            start (date): Earliest date in format YYYY-mm-dd.
+            end (date): Latest date in format YYYY-mm-dd.
+            hafs (bool): Only storms with (true) or without (false) HAFS tracks.
+            limit (int): Maximum number of storms.
 
-    @get(path="/{date_str:str}/{storm_id:str}/ucar/image", cache=3600)
-    async def get_storm_image(self, date_str: str, storm_id: str) -> Response[bytes]:
+        Returns:
+            Storms: Newest first, with name, basin, model cycles and image types.
+        """
+        try:
+            rows = query_storms(
+                basin=basin,
+                start=None if start is None else start.isoformat(),
+                end=None if end is None else end.isoformat(),
+                has_hafs=hafs,
+                limit=limit,
+            )
+        except sqlite3.OperationalError:
+            # Nothing cataloged yet
+            return Storms(storms=[])
+        return Storms(
+            storms=[
+                Storm(
+                    id=row["id"],
+                    date=row["date"],
+                    image_types=[
+                        IMAGE_TYPES[x] for x in IMAGE_TYPES if x in row["filenames"]
+                    ],
+                    updated_at=row["updated_at"],
+                    version=row["version"],
+                    name=row["name"],
+                    basin=row["basin"],
+                    cycles=row["cycles"],
+                )
+                for row in rows
+            ]
+        )
+
+    @get(path="/{date_str:str}/{storm_id:str}/ucar/image")
+    async def get_storm_image(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
         """
         Handles a GET request for a specific storm image.
 
         Args:
             date_str (str): The date str in format YYYY-mm-dd
             storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
 
         Returns:
-            Bytes media type image/jpeg.
+            Bytes media type image/jpeg, or 304 if the ETag matches.
         """
 
-        with open(
-            f"{IMAGES_DIR}/{date_str}/{storm_id}/ucar_tropycal_forecast_realtime.jpg",
-            "rb",
-        ) as image_file:
-            image_data = image_file.read()
+        return storm_file_response(
+            date_str,
+            storm_id,
+            "ucar_tropycal_forecast_realtime.jpg",
+            "image/jpeg",
+            if_none_match,
+        )
+
+    @get(path="/{date_str:str}/{storm_id:str}/ucar/myimage")
+    async def get_mystorm_image(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
+        """
+        Handles a GET request for a specific storm image.
 
-        return Response(image_data, media_type="image/jpeg")
+        Args:
+            date_str (str): The date str in format YYYY-mm-dd
+            storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
 
-    @get(path="/{date_str:str}/{storm_id:str}/ucar/myimage", cache=3600)
-    async def get_mystorm_image(self, date_str: str, storm_id: str) -> Response[bytes]:
+        Returns:
+            Bytes media type image/jpeg, or 304 if the ETag matches.
+        """
+
+        return storm_file_response(
+            date_str, storm_id, "ucar_myimage.jpg", "image/jpeg", if_none_match
+        )
+
+    @get(path="/{date_str:str}/{storm_id:str}/compare")
+    async def get_compare_image(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
         """
         Handles a GET request for a specific storm image.
 
         Args:
             date_str (str): The date str in format YYYY-mm-dd
             storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
 
         Returns:
-            Bytes media type image/jpeg.
+            Bytes media type image/jpeg, or 304 if the ETag matches.
         """
 
-        with open(
-            f"{IMAGES_DIR}/{date_str}/{storm_id}/ucar_myimage.jpg", "rb"
-        ) as image_file:
-            image_data = image_file.read()
-
-        return Response(image_data, media_type="image/jpeg")
+        return storm_file_response(
+            date_str, storm_id, "compare.jpg", "image/jpeg", if_none_match
+        )
 
-    @get(path="/{date_str:str}/{storm_id:str}/compare", cache=3600)
-    async def get_compare_image(self, date_str: str, storm_id: str) -> Response[bytes]:
+    @get(path="/{date_str:str}/{storm_id:str}/spaghetti")
+    async def get_spaghetti_image(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
         """
         Handles a GET request for a specific storm image.
 
         Args:
             date_str (str): The date str in format YYYY-mm-dd
             storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
 
         Returns:
-            Bytes media type image/jpeg.
+            Bytes media type image/jpeg, or 304 if the ETag matches.
         """
 
-        with open(
-            f"{IMAGES_DIR}/{date_str}/{storm_id}/compare.jpg", "rb"
-        ) as image_file:
-            image_data = image_file.read()
+        return storm_file_response(
+            date_str, storm_id, "spaghetti.jpg", "image/jpeg", if_none_match
+        )
 
-        return Response(image_data, media_type="image/jpeg")
+    @get(path="/{date_str:str}/{storm_id:str}/intensity")
+    async def get_intensity_image(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
+        """
+        Handles a GET request for a storm's forecast intensity chart.
 
-    @get(path="/{date_str:str}/{storm_id:str}/spaghetti", cache=3600)
-    async def get_spaghetti_image(
-        self, date_str: str, storm_id: str
+        Args:
+            date_str (str): The date str in format YYYY-mm-dd
+            storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
+
+        Returns:
+            Bytes media type image/jpeg, or 304 if the ETag matches.
+        """
+
+        return storm_file_response(
+            date_str, storm_id, "intensity.jpg", "image/jpeg", if_none_match
+        )
+
+    @get(path="/{date_str:str}/{storm_id:str}/intensity/data")
+    async def get_intensity_data(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
     ) -> Response[bytes]:
         """
-        Handles a GET request for a specific storm image.
+        Handles a GET request for the wind by forecast hour behind the intensity chart.
+
+        Args:
+            date_str (str): The date str in format YYYY-mm-dd
+            storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
+
+        Returns:
+            Bytes media type application/json, winds as packed arrays.
+        """
+
+        return storm_file_response(
+            date_str, storm_id, "intensity.json", "application/json", if_none_match
+        )
+
+    @get(path="/{date_str:str}/{storm_id:str}/analytics")
+    async def get_storm_analytics(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
+        """
+        Handles a GET request for a storm's model consensus and track errors.
 
         Args:
             date_str (str): The date str in format YYYY-mm-dd
             storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
 
         Returns:
-            Bytes media type image/jpeg.
+            Bytes media type application/json.
+        """
+
+        return storm_file_response(
+            date_str, storm_id, "analytics.json", "application/json", if_none_match
+        )
+
+    @get(path="/{date_str:str}/{storm_id:str}/cone")
+    async def get_storm_cone(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
         """
+        Handles a GET request for a storm's forecast uncertainty cone.
 
-        with open(
-            f"{IMAGES_DIR}/{date_str}/{storm_id}/spaghetti.jpg", "rb"
-        ) as image_file:
-            image_data = image_file.read()
+        Args:
+            date_str (str): The date str in format YYYY-mm-dd
+            storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
+
+        Returns:
+            Bytes media type application/geo+json.
+        """
 
-        return Response(image_data, media_type="image/jpeg")
+        return storm_file_response(
+            date_str, storm_id, "cone.geojson", "application/geo+json", if_none_match
+        )
+
+    @get(path="/{date_str:str}/{storm_id:str}/tracks")
+    async def get_storm_tracks(
+        self, date_str: str, storm_id: str, if_none_match: IfNoneMatchHeader = None
+    ) -> Response[bytes]:
+        """
+        Handles a GET request for a storm's observed and forecast tracks.
+
+        Args:
+            date_str (str): The date str in format YYYY-mm-dd
+            storm_id (str): The id of the storm to retrieve.
+            if_none_match (str): ETag the client already has.
+
+        Returns:
+            Bytes media type application/json, tracks as packed arrays.
+        """
+
+        return storm_file_response(
+            date_str, storm_id, "tracks.json", "application/json", if_none_match
+        )
+
+    @get(
+        path="/{date_str:str}/{storm_id:str}/tiles/{z:int}/{x:int}/{y:int}",
+        sync_to_thread=True,
+    )
+    @sampled_in_thread
+    def get_storm_tile(
+        self,
+        date_str: str,
+        storm_id: str,
+        z: int,
+        x: int,
+        y: int,
+        if_none_match: IfNoneMatchHeader = None,
+    ) -> Response[bytes]:
+        """
+        Handles a GET request for a Web Mercator XYZ tile of a storm's tracks.
+
+        Tiles are transparent overlays of the cone, observed track and model
+        tracks, rendered on first request and cached per storm version.
+
+        Args:
+            date_str (str): The date str in format YYYY-mm-dd
+            storm_id (str): The id of the storm to retrieve.
+            z (int): Zoom level, 0 to MAX_ZOOM.
+            x (int): Tile column.
+            y (int): Tile row.
+            if_none_match (str): ETag the client already has.
+
+        Returns:
+            Bytes media type image/png, or 304 if the ETag matches.
+        """
+        if not is_valid_tile(z, x, y):
+            raise ValidationException(f"invalid tile {z}/{x}/{y}, max zoom {MAX_ZOOM}")
+
+        version, tracks_data = read_storm_file(date_str, storm_id, "tracks.json")
+        headers = {
+            "ETag": f'"{version}.{z}.{x}.{y}"',
+            "Cache-Control": "public, max-age=60",
+        }
+        if if_none_match == headers["ETag"]:
+            return Response(
+                b"", status_code=304, headers=headers, media_type="image/png"
+            )
+        try:
+            cone = json.loads(read_storm_file(date_str, storm_id, "cone.geojson")[1])
+        except NotFoundException:
+            cone = None
+        data = get_tile(
+            date_str, storm_id, version, json.loads(tracks_data), cone, z, x, y
+        )
+        return Response(data, headers=headers, media_type="image/png")
@@ -1,4 +1,17 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+# Files a published storm can have, mapped to their route under the storm
+IMAGE_TYPES = {
+    "ucar_tropycal_forecast_realtime.jpg": "ucar/image",
+    "ucar_myimage.jpg": "ucar/myimage",
+    "compare.jpg": "compare",
+    "spaghetti.jpg": "spaghetti",
+    "analytics.json": "analytics",
+    "cone.geojson": "cone",
+    "tracks.json": "tracks",
+    "intensity.jpg": "intensity",
+    "intensity.json": "intensity/data",
+}
 
 
 @dataclass
@@ -6,6 +19,13 @@ class Storm:
     id: str
     date: str
     # If there are other keys in some dictionaries, you would add them here as attributes
+    image_types: list[str] = field(default_factory=list)
+    updated_at: str | None = None
+    version: str | None = None
+    name: str | None = None
+    basin: str | None = None
+    # Latest cycle (YYYYmmddHH) per model
+    cycles: dict[str, str] = field(default_factory=dict)
 
 
 @dataclass
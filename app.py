@@ -1,16 +1,55 @@
+import asyncio
+
 from litestar import Litestar
 from litestar.logging import LoggingConfig
+from litestar.middleware import MiddlewareProtocol
 from litestar.openapi import OpenAPIConfig, OpenAPIController
+from litestar.types import ASGIApp, Receive, Scope, Send
 
 from api_app.controllers.storm import StormController
+from config.config import PROFILE_SAMPLE_RATE
+from profiling import save_sampled, start_request_sample, stop_request_sample
 
 
 class MyOpenAPIController(OpenAPIController):
     path = "/api/docs"
 
 
+class ProfilingMiddleware(MiddlewareProtocol):
+    """Profile a sample of StormController requests, see PROFILE_SAMPLE_RATE.
+
+    Only one request is profiled at a time, requests that overlap it are not
+    sampled. Profiles are written from a worker thread. sync_to_thread
+    handlers run off the event loop, they profile themselves with
+    profiling.sampled_in_thread.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = None
+        if (
+            scope["type"] == "http"
+            and scope["path"].startswith(StormController.path)
+            and not scope["route_handler"].sync_to_thread
+        ):
+            profiler = start_request_sample()
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stop_request_sample(profiler)
+        await asyncio.to_thread(
+            save_sampled, profiler, f"api_{scope['route_handler'].handler_name}"
+        )
+
+
 app = Litestar(
     route_handlers=[StormController],
+    middleware=[ProfilingMiddleware] if PROFILE_SAMPLE_RATE > 0 else [],
     openapi_config=OpenAPIConfig(
         title="HackerNews API", version="1.0.0", openapi_controller=MyOpenAPIController
     ),
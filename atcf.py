@@ -0,0 +1,148 @@
+import datetime
+import gzip
+import logging
+import re
+from collections.abc import Iterable
+from typing import Any
+
+import pandas as pd
+
+import resilience
+from models import StormForecast, StormForecasts
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+atcf_endpoint = "https://ftp.nhc.noaa.gov/atcf"
+
+# a-decks hold every model's forecasts, b-decks the best track so far
+DECK_DIRS = {"a": "aid_public", "b": "btk"}
+
+# File link and its modified time in the directory index
+DECK_LISTING_PATTERN = {
+    "a": re.compile(
+        rb'<a href="(a(?:al|ep|cp)\d{6}\.dat\.gz)">.*?</a>\s+(\d{4}-\d{2}-\d{2} \d{2}:\d{2})'
+    ),
+    "b": re.compile(
+        rb'<a href="(b(?:al|ep|cp)\d{6}\.dat)">.*?</a>\s+(\d{4}-\d{2}-\d{2} \d{2}:\d{2})'
+    ),
+}
+
+# Decks updated this recently belong to active storms
+ACTIVE_HOURS = 24
+
+# Fields past the wind (pressure, wind radii etc) are not used
+DECK_WIND_COLUMN = 8
+
+
+def get_deck_dir_url(deck: str) -> str:
+    return f"{atcf_endpoint}/{DECK_DIRS[deck]}/"
+
+
+def discover_decks(deck: str, context: Any = None) -> list[str]:
+    """URLs of a or b deck files modified within ACTIVE_HOURS."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=ACTIVE_HOURS)
+    dir_url = get_deck_dir_url(deck)
+    urls = []
+    with resilience.get(dir_url, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            for filename, modified in DECK_LISTING_PATTERN[deck].findall(line):
+                modified_at = datetime.datetime.strptime(
+                    modified.decode("utf-8"), "%Y-%m-%d %H:%M"
+                )
+                if modified_at >= cutoff:
+                    urls.append(dir_url + filename.decode("utf-8"))
+    logger.info(f"{deck}-deck found {len(urls)} active files")
+    return urls
+
+
+def parse_position(value: str) -> float:
+    """ATCF tenths of a degree with hemisphere, e.g. 805W -> -80.5."""
+    value = value.strip()
+    degrees = int(value[:-1]) / 10
+    return -degrees if value[-1] in "SW" else degrees
+
+
+def parse_deck_lines(lines: Iterable[bytes]) -> pd.DataFrame:
+    """One row per fix, duplicate wind radii rows of a fix are dropped."""
+    rows = []
+    for line in lines:
+        fields = line.decode("utf-8", errors="replace").split(",")
+        if len(fields) <= DECK_WIND_COLUMN:
+            continue
+        wind = fields[DECK_WIND_COLUMN].strip()
+        rows.append(
+            (
+                fields[0].strip(),
+                fields[1].strip(),
+                datetime.datetime.strptime(fields[2].strip(), "%Y%m%d%H"),
+                fields[4].strip(),
+                int(fields[5]),
+                parse_position(fields[6]),
+                parse_position(fields[7]),
+                float(wind) if wind else float("nan"),
+            )
+        )
+    deck_df = pd.DataFrame(
+        rows,
+        columns=["basin", "number", "cycle", "tech", "fhr", "lat", "lon", "wind_kt"],
+    )
+    return deck_df.drop_duplicates(subset=["tech", "cycle", "fhr"])
+
+
+def get_storm_id(deck_df: pd.DataFrame) -> str:
+    """Storm id as HAFS forecasts use it, e.g. 09l, so the two merge per storm."""
+    first = deck_df.iloc[0]
+    return f"{first['number']}{first['basin'][1].lower()}"
+
+
+def read_deck(url: str) -> pd.DataFrame:
+    with resilience.get(url, stream=True) as response:
+        response.raise_for_status()
+        if url.endswith(".gz"):
+            with gzip.GzipFile(fileobj=response.raw) as file_r:
+                return parse_deck_lines(file_r)
+        return parse_deck_lines(response.iter_lines())
+
+
+def to_forecast(
+    df: pd.DataFrame, storm_id: str, model_id: str, cycle: datetime.datetime
+) -> StormForecast:
+    return StormForecast(
+        dataframe=df[["fhr", "lat", "lon", "wind_kt"]].reset_index(drop=True),
+        storm_id=storm_id,
+        model_id=model_id,
+        forecast_date=cycle.date(),
+        forecast_hour=cycle.hour,
+    )
+
+
+def parse_adeck(url: str) -> StormForecasts:
+    """Latest cycle of every model (tech) in a storm's a-deck."""
+    deck_df = read_deck(url)
+    if deck_df.empty:
+        return StormForecasts()
+    storm_id = get_storm_id(deck_df)
+    forecasts = []
+    for tech, tech_df in deck_df.groupby("tech"):
+        cycle = tech_df["cycle"].max()
+        latest_df = tech_df[tech_df["cycle"] == cycle].sort_values("fhr")
+        forecasts.append(to_forecast(latest_df, storm_id, str(tech), cycle))
+    return StormForecasts(forecasts=forecasts)
+
+
+def parse_bdeck(url: str) -> StormForecasts:
+    """Latest best track fix as a BEST model at fhr 0.
+
+    Forecast tracks never have a negative fhr, earlier fixes are dropped, the
+    storm's past track comes from the tropycal history.
+    """
+    deck_df = read_deck(url)
+    if deck_df.empty:
+        return StormForecasts()
+    latest = deck_df["cycle"].max()
+    latest_df = deck_df[deck_df["cycle"] == latest].assign(fhr=0)
+    return StormForecasts(
+        forecasts=[to_forecast(latest_df, get_storm_id(deck_df), "BEST", latest)]
+    )
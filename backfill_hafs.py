@@ -0,0 +1,215 @@
+import argparse
+import datetime
+import json
+import logging
+import pathlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import hafs
+import resilience
+from config.config import HAFS_HISTORY_DIR
+
+# create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+# create console handler and set level to debug
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+# create formatter
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+# add formatter to ch
+ch.setFormatter(formatter)
+# add ch to logger
+logger.addHandler(ch)
+
+# NOMADS can take hours to publish every storm of a cycle, cycles newer than
+# this are downloaded but not checkpointed so the next run fetches them again
+SETTLE_HOURS = 24
+
+
+def manage_cli_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Download every HAFS stats.short file for a date range"
+    )
+    parser.add_argument(
+        "--start",
+        help="First date to backfill, YYYY-mm-dd",
+        type=datetime.date.fromisoformat,
+        required=True,
+    )
+    parser.add_argument(
+        "--end",
+        help="Last date to backfill, YYYY-mm-dd, default today",
+        type=datetime.date.fromisoformat,
+        default=datetime.datetime.now(datetime.UTC).date(),
+    )
+    parser.add_argument(
+        "-m",
+        "--models",
+        help="HAFS models to backfill, default all",
+        nargs="+",
+        choices=hafs.MODELS,
+        default=hafs.MODELS,
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of cycles downloaded concurrently",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="Where per cycle parquet files and the checkpoint are written",
+        default=HAFS_HISTORY_DIR,
+    )
+    args, leftovers = parser.parse_known_args()
+    return args
+
+
+def get_cycles(
+    models: list[str], start: datetime.date, end: datetime.date
+) -> list[tuple[str, str, str]]:
+    """Every (model, date_str, hour) in the range that is already in the past."""
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    cycles = []
+    mydate = start
+    while mydate <= end:
+        date_str = mydate.strftime("%Y%m%d")
+        for hour in hafs.HOURS:
+            if datetime.datetime.combine(mydate, datetime.time(int(hour))) > now:
+                continue
+            for model in models:
+                cycles.append((model, date_str, hour))
+        mydate += datetime.timedelta(days=1)
+    return cycles
+
+
+def cycle_key(model: str, date_str: str, hour: str) -> str:
+    return f"{model}.{date_str}.{hour}"
+
+
+def is_settled(date_str: str, hour: str, now: datetime.datetime | None = None) -> bool:
+    """True once a cycle is old enough that NOMADS has all of its storms."""
+    if now is None:
+        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    cycle = datetime.datetime.strptime(date_str + hour, "%Y%m%d%H")
+    return now - cycle >= datetime.timedelta(hours=SETTLE_HOURS)
+
+
+def load_checkpoint(checkpoint_path: pathlib.Path) -> set[str]:
+    if not checkpoint_path.exists():
+        return set()
+    done = set()
+    with open(checkpoint_path) as file_r:
+        for line in file_r:
+            try:
+                done.add(json.loads(line)["cycle"])
+            except (json.JSONDecodeError, KeyError):
+                # Partial last line from an interrupted run
+                continue
+    return done
+
+
+def backfill_cycle(
+    model: str, date_str: str, hour: str, output_dir: pathlib.Path
+) -> int:
+    """Download one cycle's stats.short files and write them as one parquet file.
+
+    Returns the number of storms found, only one cycle is held in memory.
+    Requests are retried with backoff by the resilience layer.
+    """
+    key = cycle_key(model, date_str, hour)
+    short_urls = hafs.get_short_urls(model, date_str, hour)
+    if len(short_urls) == 0:
+        return 0
+
+    dfs = []
+    for short_url in short_urls:
+        forecast = hafs.get_storm_forecast(model, date_str, hour, short_url)
+        df = forecast.dataframe
+        df.insert(0, "storm_id", forecast.storm_id)
+        dfs.append(df)
+
+    cycle_df = pd.concat(dfs, ignore_index=True)
+    cycle_df.insert(0, "model_id", model)
+    cycle_df.insert(
+        1,
+        "cycle",
+        pd.Timestamp(datetime.datetime.strptime(date_str + hour, "%Y%m%d%H")),
+    )
+    cycle_df["storm_id"] = cycle_df["storm_id"].astype("category")
+    cycle_df["model_id"] = cycle_df["model_id"].astype("category")
+
+    model_dir = output_dir / model
+    model_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = model_dir / f"{key}.parquet.tmp"
+    cycle_df.to_parquet(tmp_path, index=False)
+    tmp_path.rename(model_dir / f"{key}.parquet")
+    return len(short_urls)
+
+
+def main(args: argparse.Namespace) -> None:
+    logger.info(f"backfill start {args=}")
+    output_dir = pathlib.Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = output_dir / "checkpoint.jsonl"
+
+    # A season is thousands of requests, do not cap retries per run
+    resilience.retry_budget.reset(None)
+
+    done = load_checkpoint(checkpoint_path)
+    cycles = [
+        x
+        for x in get_cycles(args.models, args.start, args.end)
+        if cycle_key(*x) not in done
+    ]
+    logger.info(f"{len(done)} cycles already done, {len(cycles)} to download")
+
+    failed = 0
+    with (
+        ThreadPoolExecutor(max_workers=args.workers) as executor,
+        open(checkpoint_path, "a") as checkpoint,
+    ):
+        futures = {
+            executor.submit(
+                backfill_cycle, model, date_str, hour, output_dir
+            ): cycle_key(model, date_str, hour)
+            for model, date_str, hour in cycles
+        }
+        for i, future in enumerate(as_completed(futures)):
+            key = futures.pop(future)
+            _, date_str, hour = key.split(".")
+            try:
+                storms = future.result()
+            except Exception:
+                failed += 1
+                logger.exception(f"{key} failed, will retry on next run")
+                continue
+            if not is_settled(date_str, hour):
+                logger.info(f"{i + 1}/{len(cycles)} {key} {storms=}, not settled")
+                continue
+            checkpoint.write(json.dumps({"cycle": key, "storms": storms}) + "\n")
+            checkpoint.flush()
+            logger.info(f"{i + 1}/{len(cycles)} {key} {storms=}")
+
+    logger.info(f"backfill done, {failed=}")
+
+
+def load_hafs_history(
+    output_dir: str = HAFS_HISTORY_DIR, model: str | None = None
+) -> pd.DataFrame:
+    """Read backfilled cycles back as one DataFrame."""
+    path = pathlib.Path(output_dir)
+    files = sorted(path.glob(f"{model or '*'}/*.parquet"))
+    if len(files) == 0:
+        return pd.DataFrame()
+    return pd.concat([pd.read_parquet(x) for x in files], ignore_index=True)
+
+
+if __name__ == "__main__":
+    args = manage_cli_args()
+    main(args)
@@ -0,0 +1,98 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import matplotlib.pyplot as plt
+
+import generate_storm_plots
+from generate_storm_plots import PLOT_FUNCTIONS, get_data, get_storm_inputs
+from plot import get_render_context, init_render_worker
+from sources import FORECASTS_GROUP
+from styles import RENDER_PROFILES
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def manage_cli_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Time and size of each plot for every render profile, "
+        "using the data pickled by `python generate_storm_plots.py -t`"
+    )
+    parser.add_argument("-s", "--storm-id", help="Storm to plot, default first active")
+    parser.add_argument(
+        "-p",
+        "--plots",
+        nargs="+",
+        choices=list(PLOT_FUNCTIONS.keys()),
+        default=list(PLOT_FUNCTIONS.keys()),
+    )
+    parser.add_argument(
+        "-r",
+        "--render-profiles",
+        nargs="+",
+        choices=list(RENDER_PROFILES.keys()),
+        default=list(RENDER_PROFILES.keys()),
+    )
+    parser.add_argument(
+        "-n", "--repeats", help="Renders per plot and profile", type=int, default=3
+    )
+    return parser.parse_args()
+
+
+def benchmark_plot(
+    plot_name: str, profile_name: str, storm_id: str, data: dict, repeats: int
+) -> tuple[float, int]:
+    """Best render time in seconds and output size in bytes."""
+    func = PLOT_FUNCTIONS[plot_name]
+    render_profile = RENDER_PROFILES[profile_name]
+    times = []
+    size = 0
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as my_dir:
+            os.makedirs(f"{my_dir}/{storm_id}")
+            start = time.perf_counter()
+            with get_render_context(render_profile):
+                func(
+                    my_dir=my_dir,
+                    storm_id=storm_id,
+                    render_profile=render_profile,
+                    **data,
+                )
+            times.append(time.perf_counter() - start)
+            plt.close("all")
+            size = sum(x.stat().st_size for x in os.scandir(f"{my_dir}/{storm_id}"))
+    return min(times), size
+
+
+def main(args: argparse.Namespace) -> None:
+    # Only benchmark against pickled data, never the live sources
+    generate_storm_plots.TEST = True
+    realtime_obj = get_data("tropycal_realtime")
+    storm_id = args.storm_id or realtime_obj.list_active_storms()[0]
+    data = get_storm_inputs(realtime_obj, storm_id)
+    if data is None:
+        raise ValueError(f"{storm_id} has no pickled data")
+    data["hafs_storms"] = get_data(FORECASTS_GROUP)
+
+    warm_up = init_render_worker(
+        {RENDER_PROFILES[x].scale for x in args.render_profiles}
+    )
+    print(f"render worker warm up {warm_up:.2f}s, excluded from the timings below")
+
+    print(f"{'plot':<10} {'profile':<9} {'seconds':>8} {'KiB':>8}")
+    for plot_name in args.plots:
+        for profile_name in args.render_profiles:
+            seconds, size = benchmark_plot(
+                plot_name, profile_name, storm_id, data, args.repeats
+            )
+            print(
+                f"{plot_name:<10} {profile_name:<9} {seconds:>8.2f} {size/1024:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig()
+    main(manage_cli_args())
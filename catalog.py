@@ -0,0 +1,235 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from typing import Any
+
+from config.config import CATALOG_DB_PATH
+from hafs import MODELS as HAFS_MODELS
+from styles import my_models
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS storms (
+    date_str TEXT NOT NULL,
+    storm_id TEXT NOT NULL,
+    name TEXT,
+    basin TEXT NOT NULL,
+    version TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (date_str, storm_id)
+);
+CREATE INDEX IF NOT EXISTS storms_basin_date ON storms (basin, date_str);
+CREATE TABLE IF NOT EXISTS models (
+    model_id TEXT PRIMARY KEY,
+    name TEXT,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cycles (
+    date_str TEXT NOT NULL,
+    storm_id TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    cycle TEXT NOT NULL,
+    PRIMARY KEY (date_str, storm_id, model_id)
+);
+CREATE INDEX IF NOT EXISTS cycles_model ON cycles (model_id);
+-- path is relative to IMAGES_DIR through the storm link, it stays valid as
+-- versions are pruned and is the name of the file in the day's archive
+CREATE TABLE IF NOT EXISTS artifacts (
+    date_str TEXT NOT NULL,
+    storm_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    PRIMARY KEY (date_str, storm_id, filename)
+);
+"""
+
+
+def connect(path: str = CATALOG_DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def connect_readonly(path: str = CATALOG_DB_PATH) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=10)
+
+
+def get_model_source(model_id: str) -> str:
+    return "hafs" if model_id in HAFS_MODELS else "tropycal"
+
+
+def get_basin(storm_id: str) -> str:
+    """Basin code from an ATCF style storm id, e.g. AL092024 -> AL."""
+    return storm_id[:2].upper()
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as file_r:
+        for chunk in iter(lambda: file_r.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def record_storm(date_str: str, storm_id: str, version: str, version_dir: str) -> None:
+    """Catalog a published storm version: storm, model cycles and artifacts.
+
+    Names and cycles come from the tracks.json published with the storm.
+    """
+    storm_tracks: dict[str, Any] = {}
+    try:
+        with open(f"{version_dir}/tracks.json") as file_r:
+            storm_tracks = json.load(file_r)
+    except (FileNotFoundError, json.JSONDecodeError):
+        logger.warning(f"{storm_id} {version=} has no tracks.json, no cycles")
+
+    cycles = [
+        (model_id, track["cycle"])
+        for model_id, track in storm_tracks.get("forecasts", {}).items()
+    ]
+    artifacts = []
+    for entry in os.scandir(version_dir):
+        if not entry.is_file():
+            continue
+        artifacts.append(
+            (
+                entry.name,
+                f"{date_str}/{storm_id}/{entry.name}",
+                entry.stat().st_size,
+                file_sha1(entry.path),
+            )
+        )
+
+    conn = connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO storms VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                date_str,
+                storm_id,
+                storm_tracks.get("name"),
+                get_basin(storm_id),
+                version,
+                datetime.datetime.now(datetime.UTC).isoformat(),
+            ),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO models VALUES (?, ?, ?)",
+            [
+                (
+                    model_id,
+                    my_models.get(model_id, {}).get("name"),
+                    get_model_source(model_id),
+                )
+                for model_id, _ in cycles
+            ],
+        )
+        conn.execute(
+            "DELETE FROM cycles WHERE date_str = ? AND storm_id = ?",
+            (date_str, storm_id),
+        )
+        conn.executemany(
+            "INSERT INTO cycles VALUES (?, ?, ?, ?)",
+            [(date_str, storm_id, model_id, cycle) for model_id, cycle in cycles],
+        )
+        conn.execute(
+            "DELETE FROM artifacts WHERE date_str = ? AND storm_id = ?",
+            (date_str, storm_id),
+        )
+        conn.executemany(
+            "INSERT INTO artifacts VALUES (?, ?, ?, ?, ?, ?)",
+            [(date_str, storm_id, *artifact) for artifact in artifacts],
+        )
+    conn.close()
+    logger.info(f"{storm_id} {version=} cataloged {len(artifacts)} artifacts")
+
+
+def remove_date(date_str: str) -> None:
+    """Forget a day deleted by retention."""
+    if not os.path.exists(CATALOG_DB_PATH):
+        return
+    conn = connect()
+    with conn:
+        for table in ["storms", "cycles", "artifacts"]:
+            conn.execute(f"DELETE FROM {table} WHERE date_str = ?", (date_str,))
+    conn.close()
+
+
+def query_storms(
+    basin: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    has_hafs: bool | None = None,
+    limit: int = 100,
+) -> list[dict[str, Any]]:
+    """Storms matching every given filter, newest first.
+
+    Each storm has its latest cycle per model and its artifact filenames.
+    """
+    where = []
+    params: list[Any] = []
+    if basin is not None:
+        where.append("s.basin = ?")
+        params.append(basin.upper())
+    if start is not None:
+        where.append("s.date_str >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("s.date_str <= ?")
+        params.append(end)
+    if has_hafs is not None:
+        where.append(
+            ("" if has_hafs else "NOT ")
+            + "EXISTS (SELECT 1 FROM cycles c JOIN models m USING (model_id)"
+            " WHERE c.date_str = s.date_str AND c.storm_id = s.storm_id"
+            " AND m.source = 'hafs')"
+        )
+    # Cycles and filenames are gathered per storm in the same query
+    sql = (
+        "SELECT s.date_str, s.storm_id, s.name, s.basin, s.version, s.updated_at,"
+        " (SELECT json_group_object(c.model_id, c.cycle) FROM cycles c"
+        "  WHERE c.date_str = s.date_str AND c.storm_id = s.storm_id),"
+        " (SELECT json_group_array(a.filename) FROM artifacts a"
+        "  WHERE a.date_str = s.date_str AND a.storm_id = s.storm_id)"
+        " FROM storms s"
+    )
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY s.date_str DESC, s.storm_id LIMIT ?"
+    params.append(limit)
+
+    conn = connect_readonly()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            "id": storm_id,
+            "date": date_str,
+            "name": name,
+            "basin": basin,
+            "version": version,
+            "updated_at": updated_at,
+            "cycles": json.loads(cycles),
+            "filenames": json.loads(filenames),
+        }
+        for (
+            date_str,
+            storm_id,
+            name,
+            basin,
+            version,
+            updated_at,
+            cycles,
+            filenames,
+        ) in rows
+    ]
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+from typing import Any
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+
+from config.config import CONE_DIR
+from geo import geodesic_circles, unwrap_lon
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Cone radius in nautical miles by forecast hour
+my_cone = {
+    0: 0,
+    12: 16,
+    24: 26,
+    36: 39,
+    48: 53,
+    60: 67,
+    72: 81,
+    96: 99,
+    108: 145,
+    120: 205,
+}
+
+# Cone polygons are fixed once a cycle is issued, keyed by (storm_id, cycle)
+_CONE_CACHE: dict[tuple[str, str], shapely.Geometry] = {}
+
+
+def get_cone_radii(fhrs: np.ndarray) -> np.ndarray:
+    """Cone radius for each forecast hour, NaN past the end of the table."""
+    return np.interp(
+        np.asarray(fhrs, dtype=float),
+        list(my_cone.keys()),
+        list(my_cone.values()),
+        right=np.nan,
+    )
+
+
+def make_cone(
+    fhrs: np.ndarray, lats: np.ndarray, lons: np.ndarray, n_bearings: int = 64
+) -> shapely.Geometry:
+    """Buffer a forecast track by the my_cone radii.
+
+    Every forecast point becomes a geodesic circle, consecutive circles are
+    joined by their convex hull and all hulls are unioned in one call.
+    """
+    fhrs = np.asarray(fhrs, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    order = np.argsort(fhrs)
+    fhrs, lats, lons = fhrs[order], lats[order], unwrap_lon(lons[order])
+    radii = get_cone_radii(fhrs)
+    keep = ~(np.isnan(radii) | np.isnan(lats) | np.isnan(lons))
+    if keep.sum() == 0:
+        return shapely.Polygon()
+    circle_lats, circle_lons = geodesic_circles(
+        lats[keep], lons[keep], radii[keep], n_bearings=n_bearings
+    )
+    circles = np.stack([circle_lons, circle_lats], axis=-1)
+    if len(circles) == 1:
+        return shapely.convex_hull(shapely.multipoints(circles[0]))
+
+    # Pair each circle with the next one, hull each pair, then union all hulls
+    pairs = np.concatenate([circles[:-1], circles[1:]], axis=1)
+    n_pairs, n_coords = pairs.shape[0], pairs.shape[1]
+    hulls = shapely.convex_hull(
+        shapely.multipoints(
+            pairs.reshape(-1, 2), indices=np.repeat(np.arange(n_pairs), n_coords)
+        )
+    )
+    return shapely.union_all(hulls)
+
+
+def _cache_path(storm_id: str, cycle: str) -> str:
+    return f"{CONE_DIR}/{storm_id}_{cycle}.geojson"
+
+
+def cone_to_geojson(storm_id: str, cycle: str, cone: shapely.Geometry) -> str:
+    feature = {
+        "type": "Feature",
+        "properties": {"storm_id": storm_id, "cycle": cycle},
+        "geometry": mapping(cone),
+    }
+    return json.dumps(feature)
+
+
+def get_storm_cone(
+    storm_id: str, tropycal_forecast: dict
+) -> tuple[str, shapely.Geometry]:
+    """Cone for a storm's official forecast, computed once per cycle."""
+    cycle = tropycal_forecast["init"].strftime("%Y%m%d%H")
+    key = (storm_id, cycle)
+    if key in _CONE_CACHE:
+        return cycle, _CONE_CACHE[key]
+
+    path = _cache_path(storm_id, cycle)
+    if os.path.exists(path):
+        with open(path) as file_r:
+            cone = shape(json.load(file_r)["geometry"])
+    else:
+        logger.info(f"{storm_id} {cycle=} build cone")
+        cone = make_cone(
+            tropycal_forecast["fhr"], tropycal_forecast["lat"], tropycal_forecast["lon"]
+        )
+        os.makedirs(CONE_DIR, exist_ok=True)
+        with open(path, "w") as file_w:
+            file_w.write(cone_to_geojson(storm_id, cycle, cone))
+    _CONE_CACHE[key] = cone
+    return cycle, cone
+
+
+def write_cone(
+    my_dir: str, storm_id: str, tropycal_forecast: dict, **kwargs: Any
+) -> None:
+    """Save a storm's cone as GeoJSON next to its images for the API."""
+    cycle, cone = get_storm_cone(storm_id, tropycal_forecast)
+    with open(f"{my_dir}/{storm_id}/cone.geojson", "w") as file_w:
+        file_w.write(cone_to_geojson(storm_id, cycle, cone))
@@ -1,4 +1,43 @@
+import os
 import pathlib
 
 MODULE_DIR = pathlib.Path(__file__).resolve().parent.parent
 IMAGES_DIR = f"{MODULE_DIR}/exported-images"
+ANALYTICS_DIR = f"{MODULE_DIR}/analytics-cache"
+CONE_DIR = f"{MODULE_DIR}/cone-cache"
+HAFS_HISTORY_DIR = f"{MODULE_DIR}/hafs-history"
+ARCHIVE_DIR = f"{MODULE_DIR}/exported-images-archive"
+# Publishes announced by the scraper, polled by the API to evict its caches
+CHANGES_DB_PATH = f"{IMAGES_DIR}/changes.db"
+CHANGES_KEEP = 1000
+CHANGES_POLL_SECONDS = 1.0
+# Storms, model cycles and published files, queried by the API
+CATALOG_DB_PATH = f"{IMAGES_DIR}/catalog.db"
+# Map tiles rendered on request by the API, kept for the hot days only
+TILES_DIR = f"{MODULE_DIR}/tile-cache"
+# Days kept as plain files, then packed into per day archives until deleted
+HOT_DAYS = 7
+RETENTION_DAYS = 120
+# Last successful download of each source, used when a source is down
+DATA_CACHE_DIR = f"{MODULE_DIR}/data-cache"
+# Outbound requests: seconds, retries per call, retries per run, breaker tuning
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+RETRY_COUNT = 3
+RETRY_BUDGET = 30
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_SECONDS = 300
+# Profiles from --profile and sampled API requests
+PROFILE_DIR = f"{MODULE_DIR}/profiles"
+# Fraction of API requests to profile, off unless set in the environment
+PROFILE_SAMPLE_RATE = float(os.environ.get("STORM_TRACKER_PROFILE_RATE", "0"))
+# Render profile names from styles.RENDER_PROFILES, per plot overrides the default
+DEFAULT_RENDER_PROFILE = "standard"
+PLOT_RENDER_PROFILES: dict[str, str] = {}
+# HAFS variants on NOMADS, each is registered as a source named hafs_{model}
+HAFS_MODELS = ["hfsa", "hfsb"]
+# Sources merged into the StormForecasts plotted with the tropycal models,
+# add "atcf_adeck" and "atcf_bdeck" to also ingest the NHC ATCF decks
+FORECAST_SOURCES = [f"hafs_{model}" for model in HAFS_MODELS]
+# Storms a --render-subprocess process renders before it is replaced
+RENDER_PROCESS_MAX_STORMS = 4
@@ -1,15 +1,53 @@
 import argparse
 import datetime
+import gc
+import itertools
 import logging
-import pathlib
+import os
+import pickle
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from typing import Any, Callable
 
+import matplotlib.pyplot as plt
 from tropycal import realtime
 
-import hafs
-from config.config import IMAGES_DIR
-from models import StormForecasts
-from plot import plot_compare_forecasts, plot_spaghetti, plot_storm
+import resilience
+import sources
+from analytics import StormInputs, compute_storms_analytics, write_analytics
+from cone import write_cone
+from config.config import (
+    DATA_CACHE_DIR,
+    DEFAULT_RENDER_PROFILE,
+    PLOT_RENDER_PROFILES,
+    RENDER_PROCESS_MAX_STORMS,
+)
+from memory import log_rss_summary, rss_stage
+from models import RenderProfile, StormForecasts
+from plot import (
+    get_hafs_storm_id,
+    get_my_recent_forecasts,
+    get_render_context,
+    init_render_worker,
+    plot_compare_forecasts,
+    plot_intensity,
+    plot_spaghetti,
+    plot_storm,
+    tropycal_to_df,
+)
+from profiling import cprofiled
+from publish import get_staging_dir, prepare_staging, publish_storm
+from retention import apply_retention
+from sources import FORECASTS_GROUP
+from styles import RENDER_PROFILES
+from tracks import write_tracks
 
 # create logger
 logger = logging.getLogger(__name__)
@@ -46,33 +84,76 @@ def manage_cli_args() -> argparse.Namespace:
         "--storm-id",
         help="Which currently active storm to plot",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of threads downloading storm data concurrently",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--profile",
+        help="Save a cProfile of each plot function per storm to PROFILE_DIR",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "-r",
+        "--render-profile",
+        help="Render profile for every plot, default per plot from PLOT_RENDER_PROFILES",
+        choices=list(RENDER_PROFILES.keys()),
+        default=None,
+    )
+    parser.add_argument(
+        "--spaghetti-models",
+        help="Models on the spaghetti plot, e.g. HWRF AVNO hfsa, default every model with a forecast",
+        nargs="+",
+        default=None,
+    )
+    parser.add_argument(
+        "--memory-bounded",
+        help="Download at most --workers storms ahead of rendering and free each storm's data once it is published",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--render-subprocess",
+        help="Render each storm in a subprocess replaced every RENDER_PROCESS_MAX_STORMS storms, implies --memory-bounded",
+        default=False,
+        action="store_true",
+    )
     args, leftovers = parser.parse_known_args()
     return args
 
 
-def get_data(
-    data_type: str, tropycal_hist: None | realtime.Realtime = None
-) -> realtime.Realtime | StormForecasts:
-    import pickle
+def get_data(data_type: str, context: Any = None) -> Any:
+    """Download a registered source (see sources.py), or load its cached copy.
 
+    Per storm data types carry the storm id, e.g. tropycal_models_AL092024,
+    and take the tropycal storm as context.
+    """
     logger.info(f"get_data {data_type=} start")
 
-    def download_current_data(
-        data_type: str,
-    ) -> realtime.Realtime | StormForecasts:
+    def download_current_data(data_type: str) -> Any:
         logger.info(f"download_data {data_type=} download")
-        if data_type == "ucar":
-            data = realtime.Realtime(jtwc=True, jtwc_source=data_type)
-        if data_type == "hafs":
-            data = hafs.get_most_recent_forecasts()
-        if data_type.startswith("all_forecasts"):
-            if tropycal_hist is not None:
-                data = tropycal_hist.get_operational_forecasts()
-
-        return data
+        return sources.fetch(data_type, context)
 
     if not TEST:
-        data = download_current_data(data_type)
+        last_good_file = f"{DATA_CACHE_DIR}/{data_type}.pkl"
+        try:
+            data = download_current_data(data_type)
+        except Exception as e:
+            # Degrade to the last successful download instead of failing the run
+            if not os.path.exists(last_good_file):
+                raise
+            logger.warning(f"get_data {data_type=} failed: {e}, using last good data")
+            with open(last_good_file, "rb") as file_r:
+                data = pickle.load(file_r)
+        else:
+            os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+            with open(f"{last_good_file}.tmp", "wb") as file_w:
+                pickle.dump(data, file_w)
+            os.replace(f"{last_good_file}.tmp", last_good_file)
     else:
         logger.info(f"get_data {data_type=} use cached")
         pickle_file = f"data_{data_type}.pkl"
@@ -99,67 +180,265 @@ def plot_tropycal(
     )
 
 
+def get_render_profile(plot_name: str, profile_name: str | None) -> RenderProfile:
+    """CLI choice first, then the plot's configured profile, then the default."""
+    if profile_name is None:
+        profile_name = PLOT_RENDER_PROFILES.get(plot_name, DEFAULT_RENDER_PROFILE)
+    return RENDER_PROFILES[profile_name]
+
+
+def get_storm_inputs(
+    realtime_obj: realtime.Realtime, storm_id: str
+) -> dict[str, Any] | None:
+    """Download one storm's tropycal history and forecasts, None on failure."""
+    logger.info(f"{storm_id} start")
+    try:
+        logger.info(f"{storm_id} get_storm_hist")
+
+        tropycal_hist = realtime_obj.get_storm(storm_id)
+
+        logger.info(f"{storm_id} get_storm_forecast")
+        tropycal_forecast = get_data(f"tropycal_official_{storm_id}", tropycal_hist)
+
+        logger.info(f"{storm_id} get_storm_forecasts (all)")
+        tropycal_forecasts = get_data(f"tropycal_models_{storm_id}", tropycal_hist)
+    except Exception as e:
+        logger.warning(f"{storm_id} Tropycal get storm forecast caught exception: {e}")
+        return None
+    return {
+        "tropycal_hist": tropycal_hist,
+        "tropycal_forecast": tropycal_forecast,
+        "tropycal_forecasts": tropycal_forecasts,
+    }
+
+
+def render_storm(
+    date_str: str,
+    storm_id: str,
+    data: dict[str, Any],
+    hafs_storms: StormForecasts,
+    my_plots: list[str],
+    profile: bool = False,
+    render_profile_name: str | None = None,
+    plot_options: dict[str, dict[str, Any]] | None = None,
+) -> None:
+    """Analytics, cone and plots for one storm, then publish its image set.
+
+    plot_options are extra keyword arguments per plot name, e.g. the models of
+    the spaghetti plot.
+    """
+    if plot_options is None:
+        plot_options = {}
+    my_dir = get_staging_dir(date_str)
+    prepare_staging(date_str, storm_id)
+
+    storm_analytics = None
+    try:
+        storms_analytics = compute_storms_analytics(
+            [
+                StormInputs(
+                    storm_id=storm_id,
+                    forecasts=get_my_recent_forecasts(
+                        storm_id,
+                        tropycal_forecasts=data["tropycal_forecasts"],
+                        hafs_storms=hafs_storms,
+                    ),
+                    history_df=tropycal_to_df(data["tropycal_hist"]),
+                    all_forecasts=data["tropycal_forecasts"],
+                )
+            ]
+        )
+        storm_analytics = storms_analytics.get(storm_id)
+    except Exception:
+        logger.exception(f"{storm_id} analytics failed with exception")
+    write_analytics(my_dir, storm_id, storm_analytics)
+
+    try:
+        write_cone(my_dir, storm_id, data["tropycal_forecast"])
+    except Exception:
+        logger.exception(f"{storm_id} cone failed with exception")
+
+    try:
+        write_tracks(
+            my_dir,
+            storm_id,
+            hafs_storms=hafs_storms,
+            storm_analytics=storm_analytics,
+            **data,
+        )
+    except Exception:
+        logger.exception(f"{storm_id} tracks failed with exception")
+
+    for plot_name in my_plots:
+        func = PLOT_FUNCTIONS[plot_name]
+        logger.info(f"{storm_id} plot {func.__name__}")
+        profiler = cprofiled(f"{storm_id}_{plot_name}") if profile else nullcontext()
+        render_profile = get_render_profile(plot_name, render_profile_name)
+        with rss_stage(f"{storm_id} plot {func.__name__}", logger):
+            try:
+                with profiler, get_render_context(render_profile):
+                    func(
+                        my_dir=my_dir,
+                        storm_id=storm_id,
+                        hafs_storms=hafs_storms,
+                        storm_analytics=storm_analytics,
+                        render_profile=render_profile,
+                        **plot_options.get(plot_name, {}),
+                        **data,
+                    )
+            except Exception:
+                logger.exception(
+                    f"{storm_id} plot {func.__name__} failed with exception"
+                )
+            finally:
+                # pyplot keeps every figure alive until it is closed
+                plt.close("all")
+    publish_storm(date_str, storm_id)
+    logger.info(f"{storm_id} done")
+
+
+def get_storm_hafs(hafs_storms: StormForecasts, storm_id: str) -> StormForecasts:
+    """Only this storm's HAFS forecasts, all a render subprocess needs sent."""
+    hafs_storm_id = get_hafs_storm_id(storm_id)
+    return StormForecasts(
+        forecasts=[x for x in hafs_storms.forecasts if x.storm_id == hafs_storm_id]
+    )
+
+
+def get_render_executor(scales: set[str]) -> ProcessPoolExecutor:
+    """One render process at a time, replaced after RENDER_PROCESS_MAX_STORMS.
+
+    Replacing the process returns whatever matplotlib, cartopy and tropycal
+    held on to, each new process warms up before its first storm.
+    """
+    return ProcessPoolExecutor(
+        max_workers=1,
+        max_tasks_per_child=RENDER_PROCESS_MAX_STORMS,
+        initializer=init_render_worker,
+        initargs=(scales,),
+    )
+
+
 def main(args: argparse.Namespace) -> None:
 
     logger.info(f"main start {args=}")
     only_plot_storm = args.storm_id
+    memory_bounded = args.memory_bounded or args.render_subprocess
 
     my_plots = list(PLOT_FUNCTIONS.keys()) if args.plot == "all" else [args.plot]
-
-    realtime_obj: realtime.Realtime = get_data("ucar")
-    hafs_storms: realtime.Realtime | StormForecasts = get_data("hafs")
-    active_storms = realtime_obj.list_active_storms()
-
-    if only_plot_storm:
-        active_storms = [x for x in active_storms if x == only_plot_storm]
-    logger.info(f"Found {active_storms=}")
-
-    if len(active_storms) == 0:
-        logger.warning("No active storms")
-        exit()
+    scales = {get_render_profile(x, args.render_profile).scale for x in my_plots}
 
     date_str = datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d")
-    my_dir = f"{IMAGES_DIR}/{date_str}"
 
-    for storm_id in active_storms:
-        logger.info(f"{storm_id} start")
+    # tropycal does not take timeouts, stop a hung connection from blocking the run
+    resilience.configure_default_timeout()
+
+    render_executor = get_render_executor(scales) if args.render_subprocess else None
+
+    # Downloads run on the pool, rendering stays on this thread as matplotlib
+    # pyplot is not thread safe. Each storm renders as soon as its inputs arrive.
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            ucar_future = executor.submit(get_data, "tropycal_realtime")
+            hafs_future = executor.submit(get_data, FORECASTS_GROUP)
+
+            # Warm up while the downloads run so plot timings are steady state
+            if render_executor is None:
+                with rss_stage("warm up", logger):
+                    init_render_worker(scales)
+
+            with rss_stage("download realtime", logger):
+                realtime_obj: realtime.Realtime = ucar_future.result()
+            active_storms = realtime_obj.list_active_storms()
+
+            if only_plot_storm:
+                active_storms = [x for x in active_storms if x == only_plot_storm]
+            logger.info(f"Found {active_storms=}")
+
+            if len(active_storms) == 0:
+                logger.warning("No active storms")
+                executor.shutdown(cancel_futures=True)
+                return
+
+            # Memory-bounded runs only hold the inputs of one storm per worker,
+            # otherwise every storm downloads at once
+            pending_storms = iter(active_storms)
+            window = args.workers if memory_bounded else len(active_storms)
+            storm_futures: dict[Future, str] = {
+                executor.submit(get_storm_inputs, realtime_obj, storm_id): storm_id
+                for storm_id in itertools.islice(pending_storms, window)
+            }
+
+            with rss_stage("download forecasts", logger):
+                try:
+                    hafs_storms: StormForecasts = hafs_future.result()
+                except Exception:
+                    logger.exception("HAFS download failed, plotting without HAFS")
+                    hafs_storms = StormForecasts()
+
+            while storm_futures:
+                done, _ = wait(storm_futures, return_when=FIRST_COMPLETED)
+                while done:
+                    future = done.pop()
+                    storm_id = storm_futures.pop(future)
+                    data = future.result()
+                    next_storm_id = next(pending_storms, None)
+                    if next_storm_id is not None:
+                        next_future = executor.submit(
+                            get_storm_inputs, realtime_obj, next_storm_id
+                        )
+                        storm_futures[next_future] = next_storm_id
+                    if data is None:
+                        continue
+                    render_kwargs = {
+                        "profile": args.profile,
+                        "render_profile_name": args.render_profile,
+                        "plot_options": {
+                            "spaghetti": {"models": args.spaghetti_models}
+                        },
+                    }
+                    with rss_stage(f"{storm_id} render", logger):
+                        if render_executor is None:
+                            render_storm(
+                                date_str,
+                                storm_id,
+                                data,
+                                hafs_storms,
+                                my_plots,
+                                **render_kwargs,
+                            )
+                        else:
+                            try:
+                                render_executor.submit(
+                                    render_storm,
+                                    date_str,
+                                    storm_id,
+                                    data,
+                                    get_storm_hafs(hafs_storms, storm_id),
+                                    my_plots,
+                                    **render_kwargs,
+                                ).result()
+                            except BrokenProcessPool:
+                                logger.exception(f"{storm_id} render process died")
+                                render_executor = get_render_executor(scales)
+                            except Exception:
+                                logger.exception(
+                                    f"{storm_id} render failed with exception"
+                                )
+                    # Drop this storm's inputs before the next storm is rendered
+                    del data, future
+                    if memory_bounded:
+                        gc.collect()
+    finally:
+        if render_executor is not None:
+            render_executor.shutdown()
+
+    with rss_stage("retention", logger):
         try:
-            logger.info(f"{storm_id} get_storm_hist")
-
-            tropycal_hist = realtime_obj.get_storm(storm_id)
-
-            logger.info(f"{storm_id} get_storm_forecast")
-            tropycal_forecast = tropycal_hist.get_forecast_realtime(
-                ssl_certificate="/usr/lib/ssl/cert.pem"
-            )
-
-            logger.info(f"{storm_id} get_storm_forecasts (all)")
-            tropycal_forecasts = get_data(f"all_forecasts_{storm_id}", tropycal_hist)
-        except Exception as e:
-            logger.warning(
-                f"{storm_id} Tropycal get storm forecast caught exception: {e}"
-            )
-            continue
-
-        pathlib.Path(f"{my_dir}/{storm_id}").mkdir(parents=True, exist_ok=True)
-
-        for plot_name in my_plots:
-            func = PLOT_FUNCTIONS[plot_name]
-            logger.info(f"{storm_id} plot {func.__name__}")
-            try:
-                func(
-                    my_dir=my_dir,
-                    storm_id=storm_id,
-                    tropycal_hist=tropycal_hist,
-                    tropycal_forecasts=tropycal_forecasts,
-                    tropycal_forecast=tropycal_forecast,
-                    hafs_storms=hafs_storms,
-                )
-            except Exception:
-                logger.exception(
-                    f"{storm_id} plot {func.__name__} failed with exception"
-                )
-        logger.info(f"{storm_id} done")
+            apply_retention()
+        except Exception:
+            logger.exception("retention failed with exception")
+    log_rss_summary(logger)
     logger.info("main done")
 
 
@@ -168,6 +447,7 @@ PLOT_FUNCTIONS: dict[str, Callable] = {
     "regular": plot_storm,
     "compare": plot_compare_forecasts,
     "spaghetti": plot_spaghetti,
+    "intensity": plot_intensity,
 }
 
 
@@ -0,0 +1,67 @@
+import numpy as np
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def wrap_lon(lons: np.ndarray) -> np.ndarray:
+    """Wrap longitudes into [-180, 180)."""
+    return (np.asarray(lons, dtype=float) + 180) % 360 - 180
+
+
+def unwrap_lon(lons: np.ndarray) -> np.ndarray:
+    """Remove 360 degree jumps so a track crossing the antimeridian is continuous."""
+    return np.rad2deg(np.unwrap(np.deg2rad(np.asarray(lons, dtype=float))))
+
+
+def great_circle_nm(
+    lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray
+) -> np.ndarray:
+    """Haversine distance in nautical miles, broadcast over all inputs."""
+    lat1, lon1, lat2, lon2 = (
+        np.deg2rad(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def to_xyz(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Unit vectors for lat/lon, stacked on a new last axis."""
+    lat = np.deg2rad(np.asarray(lats, dtype=float))
+    lon = np.deg2rad(np.asarray(lons, dtype=float))
+    return np.stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1
+    )
+
+
+def from_xyz(xyz: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Inverse of to_xyz, vectors do not need to be normalized."""
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    lats = np.rad2deg(np.arctan2(z, np.hypot(x, y)))
+    lons = np.rad2deg(np.arctan2(y, x))
+    return lats, lons
+
+
+def geodesic_circles(
+    lats: np.ndarray, lons: np.ndarray, radii_nm: np.ndarray, n_bearings: int = 64
+) -> tuple[np.ndarray, np.ndarray]:
+    """Circles of radius radii_nm around each point, computed in one broadcast.
+
+    Returns (lats, lons) arrays of shape (n_points, n_bearings). Longitudes are
+    kept continuous with the centre point, they are not wrapped to [-180, 180).
+    """
+    lat1 = np.deg2rad(np.asarray(lats, dtype=float))[:, None]
+    lon1 = np.deg2rad(np.asarray(lons, dtype=float))[:, None]
+    dist = (np.asarray(radii_nm, dtype=float) / EARTH_RADIUS_NM)[:, None]
+    bearings = np.linspace(0, 2 * np.pi, n_bearings, endpoint=False)[None, :]
+
+    lat2 = np.arcsin(
+        np.sin(lat1) * np.cos(dist) + np.cos(lat1) * np.sin(dist) * np.cos(bearings)
+    )
+    lon2 = lon1 + np.arctan2(
+        np.sin(bearings) * np.sin(dist) * np.cos(lat1),
+        np.cos(dist) - np.sin(lat1) * np.sin(lat2),
+    )
+    return np.rad2deg(lat2), np.rad2deg(lon2)
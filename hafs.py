@@ -1,10 +1,13 @@
 import datetime
 import logging
 import re
+from typing import Any, Iterable, Iterator
 
 import pandas as pd
 import requests
 
+import resilience
+from config.config import HAFS_MODELS
 from models import StormForecast, StormForecasts
 
 # create logger
@@ -26,79 +29,135 @@ hafs_endpoint = "https://nomads.ncep.noaa.gov/pub/data/nccf/com/hafs/prod"
 
 HOURS = ["00", "06", "12", "18"]
 
-MODELS = ["hfsa", "hfsb"]
-
-
-def get_recent_for_dates(model: str, dates: list[datetime.date]) -> StormForecasts:
-    model_stormforecasts = StormForecasts()
-    for mydate in sorted(dates, reverse=True):
-        date_str = mydate.strftime("%Y%m%d")
-        for hour in sorted(HOURS, reverse=True):
-            is_future_time = (
-                datetime.datetime.combine(mydate, datetime.time(int(hour)))
-                > datetime.datetime.utcnow()
-            )
-            if is_future_time:
-                continue
-            date_str = mydate.strftime("%Y%m%d")
-            logger.info(f"{model=}, {date_str=}, {hour=}")
-            try:
-                model_stormforecasts = get_forecast(model, date_str, hour)
-            except Exception as e:
-                logger.exception(f"caught error: {e}")
-                continue
-            if len(model_stormforecasts.forecasts) == 0:
-                logger.info(f"{model=}, {date_str=}, {hour=} no storms yet")
-                continue
-            return model_stormforecasts
-    return model_stormforecasts
-
-
-def get_most_recent_forecasts() -> StormForecasts:
-    today = datetime.datetime.utcnow().date()
-    yesterday = (datetime.datetime.utcnow() - datetime.timedelta(days=1)).date()
-    dates = [today, yesterday]
-    forecasts = []
-    for model in MODELS:
-        model_storms = get_recent_for_dates(model, dates)
-        forecasts.extend(model_storms.forecasts)
-    storms = StormForecasts(forecasts=forecasts)
-    return storms
+MODELS = HAFS_MODELS
+
+# HAFS runs every 6 hours, cycles can take a few hours to appear on NOMADS
+CADENCE_HOURS = 6
+LOOKBACK_HOURS = 48
+
+
+def get_recent_cycles(
+    cadence_hours: int,
+    lookback_hours: int,
+    now: datetime.datetime | None = None,
+) -> list[datetime.datetime]:
+    """Cycle times on the cadence over the lookback window, newest first."""
+    if now is None:
+        now = datetime.datetime.utcnow()
+    latest = now.replace(minute=0, second=0, microsecond=0)
+    latest -= datetime.timedelta(hours=latest.hour % cadence_hours)
+    return [
+        latest - datetime.timedelta(hours=i * cadence_hours)
+        for i in range(lookback_hours // cadence_hours + 1)
+    ]
+
+
+def discover_latest_cycle(model: str, context: Any = None) -> list[tuple[str, ...]]:
+    """(model, date_str, hour, short_url) of every storm in the newest cycle with storms."""
+    for cycle in get_recent_cycles(CADENCE_HOURS, LOOKBACK_HOURS):
+        date_str = cycle.strftime("%Y%m%d")
+        hour = cycle.strftime("%H")
+        short_urls = get_short_urls(model, date_str, hour)
+        if len(short_urls) == 0:
+            logger.info(f"{model=}, {date_str=}, {hour=} no storms yet")
+            continue
+        logger.info(f"{model=} {date_str=} {hour=} Found storms: {len(short_urls)}")
+        return [(model, date_str, hour, short_url) for short_url in short_urls]
+    return []
+
+
+def parse_storm_file(unit: tuple[str, ...]) -> StormForecast:
+    model, date_str, hour, short_url = unit
+    return get_storm_forecast(model, date_str, hour, short_url)
+
+
+# Fixed width fields of a stats.short line, each is "KEY : value"
+STATS_FIELDS = [
+    slice(0, 11),
+    slice(12, 26),
+    slice(27, 39),
+    slice(40, 65),
+    slice(66, None),
+]
+
+STATS_RENAME = {"hour": "fhr", "long": "lon", "max_surf_wind_(knots)": "wind_kt"}
+
+HREF_PATTERN = re.compile(rb'<a href="([^"]+)">')
+
+# Bytes per read when streaming responses
+CHUNK_SIZE = 16 * 1024
+
+
+def parse_stats_lines(lines: Iterable[bytes]) -> pd.DataFrame:
+    """Parse stats.short lines straight from bytes into columns.
+
+    Column names are read from the first line only, values are converted with
+    float() on the byte slices so no line is ever decoded.
+    """
+    keys: list[str] = []
+    columns: list[list[float]] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        chunks = [line[field] for field in STATS_FIELDS]
+        if not keys:
+            for chunk in chunks:
+                key = chunk.split(b":")[0].strip().lower().replace(b" ", b"_")
+                keys.append(key.decode("utf-8"))
+                columns.append([])
+        for column, chunk in zip(columns, chunks, strict=True):
+            column.append(float(chunk[chunk.index(b":") + 1 :]))
+    stats_df = pd.DataFrame(dict(zip(keys, columns, strict=True)))
+    stats_df = stats_df.rename(columns=STATS_RENAME)
+    return stats_df
 
 
 def parse_response_to_df(response: requests.Response) -> pd.DataFrame:
-    short_stats = response.content.decode("utf-8")
-    rows = []
-    for line in short_stats.splitlines():
-        fhour = line[0:11]
-        long = line[12:26]
-        lat = line[27:39]
-        press = line[40:65]
-        wind = line[66:]
-        keys = [
-            fhour,
-            long,
-            lat,
-            press,
-            wind,
-        ]
-        mydict = {}
-        for chunk in keys:
-            key = chunk.split(":")[0].strip().lower().replace(" ", "_")
-            val = float(chunk.split(":")[1].strip())
-            mydict[key] = val
-        rows.append(mydict)
-    stats_df = pd.DataFrame(rows)
-    stats_df = stats_df.rename(
-        columns={"hour": "fhr", "long": "lon", "max_surf_wind_(knots)": "wind_kt"}
+    """Parse a streamed stats.short response while it downloads."""
+    return parse_stats_lines(response.iter_lines(chunk_size=CHUNK_SIZE))
+
+
+def iter_hrefs(response: requests.Response) -> Iterator[str]:
+    """Links of a directory index, extracted line by line as it streams in."""
+    for line in response.iter_lines(chunk_size=CHUNK_SIZE):
+        for href in HREF_PATTERN.findall(line):
+            yield href.decode("utf-8")
+
+
+def get_cycle_url(model: str, date_str: str, hour: str) -> str:
+    return hafs_endpoint + f"/{model}.{date_str}/{hour}/"
+
+
+def get_short_urls(model: str, date_str: str, hour: str) -> list[str]:
+    """Names of the stats.short files in a cycle's directory index."""
+    with resilience.get(get_cycle_url(model, date_str, hour), stream=True) as response:
+        if response.status_code == 404:
+            # Cycle directory not published yet or already rotated off NOMADS
+            return []
+        response.raise_for_status()
+        return [x for x in iter_hrefs(response) if "stats.short" in x]
+
+
+def get_storm_forecast(
+    model: str, date_str: str, hour: str, short_url: str
+) -> StormForecast:
+    with resilience.get(
+        get_cycle_url(model, date_str, hour) + short_url, stream=True
+    ) as response:
+        response.raise_for_status()
+        stats_df = parse_response_to_df(response)
+    storm_id = short_url.split(".")[0]
+    return StormForecast(
+        storm_id=storm_id,
+        dataframe=stats_df,
+        forecast_date=datetime.datetime.strptime(date_str, "%Y%m%d").date(),
+        forecast_hour=int(hour),
+        model_id=model,
     )
-    return stats_df
 
 
 def get_forecast(model: str, date_str: str, hour: str) -> StormForecasts:
-    response = requests.get(hafs_endpoint + f"/{model}.{date_str}/{hour}/")
-    all_urls = re.findall('\<a href="([^"]+)"\>', str(response.content))
-    short_urls = [x for x in all_urls if "stats.short" in x]
+    short_urls = get_short_urls(model, date_str, hour)
 
     if len(short_urls) == 0:
         return StormForecasts()
@@ -106,17 +165,6 @@ def get_forecast(model: str, date_str: str, hour: str) -> StormForecasts:
     logger.info(f"{model=} {date_str=} {hour=} Found storms: {len(short_urls)}")
     forecasts = []
     for short_url in short_urls:
-        response = requests.get(
-            hafs_endpoint + f"/{model}.{date_str}/{hour}/{short_url}"
-        )
-        storm_id = short_url.split(".")[0]
-        stats_df = parse_response_to_df(response)
-        hafs_forecast = StormForecast(
-            storm_id=storm_id,
-            dataframe=stats_df,
-            forecast_date=datetime.datetime.strptime(date_str, "%Y%m%d").date(),
-            forecast_hour=int(hour),
-            model_id=model,
-        )
+        hafs_forecast = get_storm_forecast(model, date_str, hour, short_url)
         forecasts.append(hafs_forecast)
     return StormForecasts(forecasts=forecasts)
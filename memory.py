@@ -0,0 +1,80 @@
+import logging
+import resource
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+@dataclass
+class StageMemory:
+    stage: str
+    seconds: float
+    rss_mb: float | None
+    peak_rss_mb: float
+    children_peak_rss_mb: float
+
+
+# Stages measured in this process, in the order they finished
+STAGES: list[StageMemory] = []
+
+
+def get_peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size in MB, ru_maxrss is KB on Linux but bytes on macOS.
+
+    RUSAGE_CHILDREN is the largest peak of any finished child process.
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def get_rss_mb() -> float | None:
+    """Current resident set size in MB, None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as file_r:
+            pages = int(file_r.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize() / 1024 / 1024
+
+
+@contextmanager
+def rss_stage(stage: str, log: logging.Logger = logger) -> Iterator[None]:
+    """Log the time, current and peak RSS after a stage and keep it in STAGES.
+
+    The peak is for the whole process so far, a stage that raises it is the
+    one that grew memory.
+    """
+    start = time.perf_counter()
+    peak_before = get_peak_rss_mb()
+    try:
+        yield
+    finally:
+        stage_memory = StageMemory(
+            stage=stage,
+            seconds=time.perf_counter() - start,
+            rss_mb=get_rss_mb(),
+            peak_rss_mb=get_peak_rss_mb(),
+            children_peak_rss_mb=get_peak_rss_mb(resource.RUSAGE_CHILDREN),
+        )
+        STAGES.append(stage_memory)
+        rss = "?" if stage_memory.rss_mb is None else f"{stage_memory.rss_mb:.0f}"
+        log.info(
+            f"{stage} {stage_memory.seconds:.2f}s rss={rss}MB"
+            f" peak_rss={stage_memory.peak_rss_mb:.0f}MB"
+            f" (+{stage_memory.peak_rss_mb - peak_before:.0f}MB)"
+        )
+
+
+def log_rss_summary(log: logging.Logger = logger) -> None:
+    """One line per stage, with the peak of any render subprocess."""
+    for x in STAGES:
+        rss = "?" if x.rss_mb is None else f"{x.rss_mb:.0f}"
+        log.info(
+            f"memory {x.stage:<32} {x.seconds:>7.2f}s rss={rss:>5}MB"
+            f" peak={x.peak_rss_mb:.0f}MB children_peak={x.children_peak_rss_mb:.0f}MB"
+        )
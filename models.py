@@ -41,3 +41,44 @@ class StormForecast:
 @dataclass
 class StormForecasts:
     forecasts: list[StormForecast] = field(default_factory=list)
+
+
+@dataclass
+class ModelTrackError:
+    model_id: str
+    fhr: list[int]
+    mean_error_nm: list[float]
+    cycle_count: list[int]
+
+
+@dataclass
+class StormAnalytics:
+    storm_id: str
+    cycle: str
+    fhr: list[int]
+    models: list[str]
+    consensus_lat: list[float]
+    consensus_lon: list[float]
+    consensus_wind_kt: list[float]
+    spread_nm: list[float]
+    wind_min_kt: list[float]
+    wind_max_kt: list[float]
+    member_count: list[int]
+    track_errors: list[ModelTrackError] = field(default_factory=list)
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+
+@dataclass
+class RenderProfile:
+    """Output settings for a rendered image, see styles.RENDER_PROFILES."""
+
+    name: str
+    dpi: int
+    figsize: tuple[float, float]
+    # JPEG or WebP quality, 1-95
+    quality: int
+    # Natural Earth feature scale: 110m, 50m or 10m
+    scale: str
+    antialias: bool = True
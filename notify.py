@@ -0,0 +1,180 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from config.config import CHANGES_DB_PATH, CHANGES_KEEP, CHANGES_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date_str TEXT NOT NULL,
+    storm_id TEXT NOT NULL,
+    version TEXT NOT NULL,
+    filenames TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class Change:
+    id: int
+    date_str: str
+    storm_id: str
+    version: str
+    filenames: list[str]
+
+    @property
+    def generation(self) -> int:
+        """Publish generation of the version, e.g. AL092024.12 -> 12."""
+        generation = self.version.rpartition(".")[2]
+        return int(generation) if generation.isdigit() else 0
+
+
+def connect(path: str = CHANGES_DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    # WAL lets the API read while the scraper writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    return conn
+
+
+def announce(date_str: str, storm_id: str, version: str, filenames: list[str]) -> int:
+    """Record a published storm file set, returns the change id."""
+    with connect() as conn:
+        cursor = conn.execute(
+            "INSERT INTO changes (date_str, storm_id, version, filenames, created_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (date_str, storm_id, version, json.dumps(sorted(filenames)), time.time()),
+        )
+        change_id = cursor.lastrowid
+        conn.execute("DELETE FROM changes WHERE id <= ?", (change_id - CHANGES_KEEP,))
+    conn.close()
+    logger.info(f"announced {change_id=} {storm_id} {version=}")
+    return change_id
+
+
+class ChangeListener:
+    """Polls the change table for publishes newer than the last one seen.
+
+    Polling is rate limited to CHANGES_POLL_SECONDS, so calling poll on every
+    request costs one clock read most of the time.
+
+    With read_generation, the publisher's counter is checked against the
+    generations announced. A publish whose announce failed leaves the counter
+    ahead, and the listener is not current until announces catch up.
+    """
+
+    def __init__(
+        self,
+        poll_seconds: float = CHANGES_POLL_SECONDS,
+        read_generation: Callable[[], int] | None = None,
+    ) -> None:
+        self.poll_seconds = poll_seconds
+        self.read_generation = read_generation
+        self.announced_generation = 0
+        self.unannounced = False
+        self.last_id: int | None = None
+        self.last_poll = float("-inf")
+        self.conn: sqlite3.Connection | None = None
+        self.lock = threading.Lock()
+
+    @property
+    def is_current(self) -> bool:
+        """True once the table has been read and every publish was announced.
+
+        Cached data can then be trusted.
+        """
+        return self.last_id is not None and not self.unannounced
+
+    def poll(self) -> list[Change] | None:
+        """New changes since the last poll, empty if it is too soon to look.
+
+        None means changes may have been missed (first poll, the table was
+        pruned past our position or is unreadable) and callers should drop
+        everything they cached.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_poll < self.poll_seconds:
+                return []
+            self.last_poll = now
+            try:
+                if self.conn is None:
+                    self.conn = connect()
+                changes = self._read_changes()
+                if self.read_generation is None:
+                    return changes
+                return self._check_generation(changes)
+            except sqlite3.Error as e:
+                logger.warning(f"change table unreadable: {e}")
+                self.conn = None
+                self.last_id = None
+                return None
+
+    def _check_generation(self, changes: list[Change] | None) -> list[Change] | None:
+        """None while some publish is unannounced, and once more when it clears.
+
+        Files cached while a publish was unannounced may predate it.
+        """
+        assert self.read_generation is not None
+        generation = self.read_generation()
+        if changes is None:
+            # Caches are dropped, only publishes from here on matter
+            self.announced_generation = generation
+            self.unannounced = False
+            return None
+        for change in changes:
+            self.announced_generation = max(
+                self.announced_generation, change.generation
+            )
+        was_unannounced = self.unannounced
+        self.unannounced = generation > self.announced_generation
+        if self.unannounced and not was_unannounced:
+            logger.warning(
+                f"publish {generation=} not announced, checking versions on read"
+            )
+        if self.unannounced or was_unannounced:
+            return None
+        return changes
+
+    def _read_changes(self) -> list[Change] | None:
+        assert self.conn is not None
+        if self.last_id is None:
+            (max_id,) = self.conn.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM changes"
+            ).fetchone()
+            self.last_id = max_id
+            return None
+
+        rows = self.conn.execute(
+            "SELECT id, date_str, storm_id, version, filenames FROM changes"
+            " WHERE id > ? ORDER BY id",
+            (self.last_id,),
+        ).fetchall()
+        if rows and rows[0][0] != self.last_id + 1:
+            (min_id,) = self.conn.execute("SELECT MIN(id) FROM changes").fetchone()
+            if min_id > self.last_id + 1:
+                # Rows we never saw were pruned
+                self.last_id = rows[-1][0]
+                return None
+        changes = [
+            Change(
+                id=row[0],
+                date_str=row[1],
+                storm_id=row[2],
+                version=row[3],
+                filenames=json.loads(row[4]),
+            )
+            for row in rows
+        ]
+        if changes:
+            self.last_id = changes[-1].id
+        return changes
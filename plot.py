@@ -1,17 +1,51 @@
 import datetime
+import io
+import logging
+import time
+from collections.abc import Iterable
 from typing import Any
 
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
+import matplotlib
+import matplotlib.dates as mdates
 import matplotlib.lines as mlines
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from cartopy.mpl.ticker import LatitudeFormatter, LatitudeLocator, LongitudeFormatter
+from matplotlib.collections import LineCollection
 from matplotlib.pyplot import Axes
 from tropycal import realtime
 
-from models import StormForecast, StormForecasts
+from cone import get_storm_cone
+from config.config import DEFAULT_RENDER_PROFILE
+from geo import wrap_lon
+from models import RenderProfile, StormAnalytics, StormForecast, StormForecasts
+from styles import RENDER_PROFILES, SSHWS_BANDS, get_colors_sshws, my_models
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_PROFILE = RENDER_PROFILES[DEFAULT_RENDER_PROFILE]
+
+# Natural Earth features drawn by add_background_maps
+BACKGROUND_FEATURES = [
+    cfeature.STATES,
+    cfeature.BORDERS,
+    cfeature.COASTLINE,
+    cfeature.LAND,
+    cfeature.OCEAN,
+]
+
+# What init_render_worker has already loaded in this process
+_WARM_SCALES: set[str] = set()
+_WARM_STATE = {"figure": False}
+
+
+def get_hafs_storm_id(storm_id: str) -> str:
+    """Tropycal storm id (AL092024) to HAFS file prefix (09l)."""
+    return storm_id[2:4] + storm_id[1:2].lower()
 
 
 def get_my_recent_forecasts(
@@ -19,7 +53,7 @@ def get_my_recent_forecasts(
 ) -> StormForecasts:
     my_storm_forecasts = StormForecasts()
 
-    lower_storm_id = storm_id[2:4] + storm_id[1:2].lower()
+    lower_storm_id = get_hafs_storm_id(storm_id)
     tropycal_most_recent_forecasts = []
     for key in tropycal_forecasts.keys():
         my_dict = {}
@@ -59,70 +93,62 @@ def tropycal_to_df(storm: realtime.storm) -> pd.DataFrame:
     return storm_df
 
 
-def get_colors_sshws(wind_speed: int) -> str:
-    r"""
-    Retrieve the default colors for the Saffir-Simpson Hurricane Wind Scale (SSHWS).
-
-    Parameters
-    ----------
-    wind_speed : int or list
-        Sustained wind speed in knots.
+def get_lon_span(lons: np.ndarray) -> tuple[float, float]:
+    """Narrowest (west, east) longitude interval containing every point.
 
-    Returns
-    -------
-    str
-        Hex string for the corresponding color.
+    The interval starts after the largest gap between sorted longitudes, so a
+    track crossing the antimeridian gets e.g. (170, 195) instead of (-180, 180).
+    east can be above 180 but is always within 360 of west.
     """
-
-    # # If category string passed, convert to wind
-    # if isinstance(wind_speed, str):
-    #     wind_speed = category_label_to_wind(wind_speed)
-
-    # Return default SSHWS category color scale
-    if wind_speed < 5:
-        return "#FFFFFF"
-    elif wind_speed < 34:
-        return "#8FC2F2"  # '#7DB7ED'
-    elif wind_speed < 64:
-        return "#3185D3"
-    elif wind_speed < 83:
-        return "#FFFF00"
-    elif wind_speed < 96:
-        return "#FF9E00"
-    elif wind_speed < 113:
-        return "#DD0000"
-    elif wind_speed < 137:
-        return "#FF00FC"
-    else:
-        return "#8B0088"
+    lons = np.sort(wrap_lon(lons))
+    gaps = np.diff(lons, append=lons[0] + 360)
+    i = int(np.argmax(gaps))
+    west = lons[(i + 1) % len(lons)]
+    east = lons[i]
+    if east < west:
+        east += 360
+    return float(west), float(east)
 
 
 def get_plot_box(
-    lats: list[float], lons: list[float], padding_percent: float = 0.25
+    lats: np.ndarray,
+    lons: np.ndarray,
+    padding_percent: float = 0.25,
+    aspect: float = 4 / 3,
+    min_span: float = 2.0,
 ) -> tuple[tuple[float, float, float, float], float, float]:
-    storm_s = min(lats)
-    storm_n = max(lats)
-    storm_w = max(lons)
-    storm_e = min(lons)
-    # storm_box = (storm_w, storm_e, storm_s, storm_n)
-    storm_width = abs(storm_e - storm_w)
-    storm_height = abs(storm_s - storm_n)
-
-    central_lon = (storm_w + storm_e) / 2
-    central_lat = (storm_n + storm_s) / 2
-
-    padding_vertical = storm_height * padding_percent
-    padding_horizontal = storm_width * padding_percent
-
-    # If same then it is a box
-    plot_height = storm_height
-    plot_width = storm_height * 2
-
-    plot_n = (central_lat + plot_height / 2) + padding_vertical
-    plot_s = (central_lat - plot_height / 2) - padding_vertical
-    plot_e = (central_lon + plot_width / 2) + padding_horizontal
-    plot_w = (central_lon - plot_width / 2) - padding_horizontal
-    plot_box = (plot_w, plot_e, plot_s, plot_n)
+    """Map extent around a track sized to the figure's width/height aspect.
+
+    The box is returned as (w, e, s, n) in a PlateCarree frame centred on
+    central_lon, which keeps extents crossing the antimeridian contiguous.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    keep = ~(np.isnan(lats) | np.isnan(lons))
+    lats, lons = lats[keep], lons[keep]
+
+    storm_s = float(lats.min())
+    storm_n = float(lats.max())
+    storm_w, storm_e = get_lon_span(lons)
+    storm_width = max(storm_e - storm_w, min_span)
+    storm_height = max(storm_n - storm_s, min_span)
+
+    central_lon = float(wrap_lon((storm_w + storm_e) / 2))
+    central_lat = float((storm_n + storm_s) / 2)
+
+    # A degree of longitude is cos(lat) as wide as a degree of latitude, grow
+    # whichever side is short so the track fills the figure without distortion
+    lon_scale = max(float(np.cos(np.deg2rad(central_lat))), 0.1)
+    plot_width = max(storm_width, storm_height * aspect / lon_scale)
+    plot_height = max(storm_height, plot_width * lon_scale / aspect)
+
+    plot_width *= 1 + 2 * padding_percent
+    plot_height *= 1 + 2 * padding_percent
+
+    plot_n = min(central_lat + plot_height / 2, 90)
+    plot_s = max(central_lat - plot_height / 2, -90)
+    half_width = min(plot_width, 359) / 2
+    plot_box = (-half_width, half_width, plot_s, plot_n)
     return plot_box, central_lat, central_lon
 
 
@@ -149,22 +175,22 @@ def add_annotation_pointers(ax: Axes, fhr: float, xy: tuple[float, float]) -> No
     )
 
 
-def add_background_maps(ax: Axes) -> None:
+def add_background_maps(ax: Axes, scale: str = "50m") -> None:
     # Plot coastlines and political boundaries
     ax.add_feature(
-        cfeature.STATES.with_scale("50m"),
+        cfeature.STATES.with_scale(scale),
         linewidths=0.1,
         linestyle="solid",
         edgecolor="k",
     )
     ax.add_feature(
-        cfeature.BORDERS.with_scale("50m"),
+        cfeature.BORDERS.with_scale(scale),
         linewidths=0.3,
         linestyle="solid",
         edgecolor="k",
     )
     ax.add_feature(
-        cfeature.COASTLINE.with_scale("50m"),
+        cfeature.COASTLINE.with_scale(scale),
         linewidths=0.3,
         linestyle="solid",
         edgecolor="k",
@@ -172,10 +198,61 @@ def add_background_maps(ax: Axes) -> None:
 
     # Fill in continents in light gray
     ax.add_feature(
-        cfeature.LAND.with_scale("50m"), facecolor=land_color, edgecolor="face"
+        cfeature.LAND.with_scale(scale), facecolor=land_color, edgecolor="face"
     )
     ax.add_feature(
-        cfeature.OCEAN.with_scale("50m"), facecolor=water_color, edgecolor="face"
+        cfeature.OCEAN.with_scale(scale), facecolor=water_color, edgecolor="face"
+    )
+
+
+def init_render_worker(scales: Iterable[str] = (DEFAULT_PROFILE.scale,)) -> float:
+    """Prepare this process for rendering, returns the seconds it took.
+
+    Pins the headless Agg backend, loads the Natural Earth features for each
+    scale into cartopy's per process geometry cache and draws one throwaway
+    map so fonts, projections and the JPEG encoder are loaded before the
+    first real plot. Repeat calls only load scales not seen yet.
+    """
+    start = time.perf_counter()
+    matplotlib.use("Agg")
+
+    for scale in sorted(set(scales) - _WARM_SCALES):
+        for feature in BACKGROUND_FEATURES:
+            try:
+                for _ in feature.with_scale(scale).geometries():
+                    pass
+            except Exception as e:
+                logger.warning(f"warm up {feature.name} {scale} failed: {e}")
+        _WARM_SCALES.add(scale)
+
+    if not _WARM_STATE["figure"]:
+        fig = plt.figure(dpi=50)
+        ax = plt.axes(projection=ccrs.Orthographic())
+        ax.set_extent((-80, -40, 10, 40), crs=ccrs.PlateCarree())
+        add_grid_lines(ax)
+        ax.set_title("warm up", loc="left", fontweight="bold")
+        ax.legend(handles=[td, ts, c1], prop={"size": 7.5})
+        fig.savefig(io.BytesIO(), format="jpg")
+        plt.close(fig)
+        _WARM_STATE["figure"] = True
+
+    seconds = time.perf_counter() - start
+    logger.info(f"render worker warm up {seconds:.2f}s scales={sorted(_WARM_SCALES)}")
+    return seconds
+
+
+def add_cone(ax: Axes, storm_id: str, tropycal_forecast: dict) -> None:
+    _, cone = get_storm_cone(storm_id, tropycal_forecast)
+    if cone.is_empty:
+        return
+    ax.add_geometries(
+        [cone],
+        crs=ccrs.PlateCarree(),
+        facecolor=cone_color,
+        edgecolor="gray",
+        linewidth=0.5,
+        alpha=0.8,
+        zorder=0.5,
     )
 
 
@@ -203,6 +280,7 @@ def plot_storm(
     tropycal_forecast: dict,
     my_dir: str,
     storm_id: str,
+    render_profile: RenderProfile = DEFAULT_PROFILE,
     **kwargs: Any,
 ) -> plt.figure:
     tropycal_storm_df = tropycal_to_df(tropycal_hist)
@@ -212,15 +290,10 @@ def plot_storm(
         for x in tropycal_forecast["fhr"]
     ]
 
-    lons = (
-        tropycal_storm_df[tropycal_storm_df["should_plot_step"]]["lon"].tolist()
-        + tropycal_forecast["lon"]
-    )
-    lats = (
-        tropycal_storm_df[tropycal_storm_df["should_plot_step"]]["lat"].tolist()
-        + tropycal_forecast["lat"]
-    )
-    fig, ax = plot_base(lons=lons, lats=lats)
+    plot_steps = tropycal_storm_df[tropycal_storm_df["should_plot_step"]]
+    lons = np.concatenate([plot_steps["lon"], tropycal_forecast["lon"]])
+    lats = np.concatenate([plot_steps["lat"], tropycal_forecast["lat"]])
+    fig, ax = plot_base(lons=lons, lats=lats, render_profile=render_profile)
 
     ax.set_title(
         "DEVELOPING STORM: " + tropycal_storm_df["name"].values[0],
@@ -230,6 +303,8 @@ def plot_storm(
     )
     ax.legend(handles=[td, ts, c1, c2, c3, c4, c5], prop={"size": 7.5})
 
+    add_cone(ax, storm_id, tropycal_forecast)
+
     # Plot historical (already happened) Dots
     storm_line_x = []
     storm_line_y = []
@@ -285,93 +360,179 @@ def plot_storm(
     ax.set_aspect("auto")
     fig.tight_layout()
 
-    fig.savefig(f"{my_dir}/{storm_id}/ucar_myimage.jpg")
+    save_figure(fig, f"{my_dir}/{storm_id}/ucar_myimage.jpg", render_profile)
     return fig
 
 
+def get_render_context(render_profile: RenderProfile) -> Any:
+    """rcParams for a profile, wrap plotting in it so every artist picks them up."""
+    return plt.rc_context(
+        {
+            "figure.dpi": render_profile.dpi,
+            "figure.figsize": render_profile.figsize,
+            "savefig.dpi": render_profile.dpi,
+            "lines.antialiased": render_profile.antialias,
+            "patch.antialiased": render_profile.antialias,
+            "text.antialiased": render_profile.antialias,
+        }
+    )
+
+
+def save_figure(fig: plt.figure, path: str, render_profile: RenderProfile) -> None:
+    """Save with the profile's quality, the format follows the file extension."""
+    fig.savefig(
+        path,
+        dpi=render_profile.dpi,
+        pil_kwargs={"quality": render_profile.quality, "optimize": True},
+    )
+
+
 def plot_base(
-    lats: list[float], lons: list[float], padding_percent: float = 0.25
+    lats: np.ndarray,
+    lons: np.ndarray,
+    padding_percent: float = 0.25,
+    render_profile: RenderProfile = DEFAULT_PROFILE,
 ) -> tuple[plt.figure, Axes]:
+    fig = plt.figure(dpi=render_profile.dpi, figsize=render_profile.figsize)
+
     plot_box, central_lat, central_lon = get_plot_box(
-        lats, lons, padding_percent=padding_percent
+        lats,
+        lons,
+        padding_percent=padding_percent,
+        aspect=fig.get_figwidth() / fig.get_figheight(),
     )
 
-    fig = plt.figure(dpi=400)
-
     ax = plt.axes(
         projection=ccrs.Orthographic(
             central_longitude=central_lon, central_latitude=central_lat
         )
     )
 
-    add_background_maps(ax)
+    add_background_maps(ax, render_profile.scale)
 
     add_grid_lines(ax)
-    ax.set_extent(plot_box, crs=ccrs.PlateCarree())
+    ax.set_extent(plot_box, crs=ccrs.PlateCarree(central_longitude=central_lon))
 
-    add_background_maps(ax)
+    add_background_maps(ax, render_profile.scale)
 
     return fig, ax
 
 
+def get_spaghetti_tracks(
+    storm_id: str,
+    tropycal_forecasts: realtime.Realtime,
+    hafs_storms: StormForecasts | None,
+    models: list[str],
+) -> list[tuple[str, datetime.datetime, np.ndarray, np.ndarray]]:
+    """Every cycle of every requested model as (model, init, lons, lats)."""
+    tracks = []
+    for model in models:
+        if model not in tropycal_forecasts:
+            continue
+        for mydt, mycast in tropycal_forecasts[model].items():
+            tracks.append(
+                (
+                    model,
+                    datetime.datetime.strptime(mydt, "%Y%m%d%H"),
+                    np.asarray(mycast["lon"], dtype=float),
+                    np.asarray(mycast["lat"], dtype=float),
+                )
+            )
+    if hafs_storms is not None:
+        hafs_storm_id = get_hafs_storm_id(storm_id)
+        for mycast in hafs_storms.forecasts:
+            if mycast.storm_id != hafs_storm_id or mycast.model_id not in models:
+                continue
+            tracks.append(
+                (
+                    mycast.model_id,
+                    datetime.datetime.combine(
+                        mycast.forecast_date,
+                        datetime.time(hour=int(mycast.forecast_hour)),
+                    ),
+                    mycast.dataframe["lon"].to_numpy(dtype=float),
+                    mycast.dataframe["lat"].to_numpy(dtype=float),
+                )
+            )
+    return tracks
+
+
+def get_available_models(
+    storm_id: str,
+    tropycal_forecasts: realtime.Realtime,
+    hafs_storms: StormForecasts | None,
+) -> list[str]:
+    """Every model with a forecast for this storm, tropycal and HAFS."""
+    models = set(tropycal_forecasts.keys())
+    if hafs_storms is not None:
+        hafs_storm_id = get_hafs_storm_id(storm_id)
+        models.update(
+            x.model_id for x in hafs_storms.forecasts if x.storm_id == hafs_storm_id
+        )
+    return sorted(models)
+
+
 def plot_spaghetti(
     storm_id: str,
     tropycal_forecasts: realtime.Realtime,
     my_dir: str,
+    hafs_storms: StormForecasts | None = None,
+    models: list[str] | None = None,
+    render_profile: RenderProfile = DEFAULT_PROFILE,
     **kwargs: Any,
 ) -> plt.figure:
-    my_model = "HWRF"
-    mycast = tropycal_forecasts[my_model].copy()
-    lons = []
-    lats = []
-    for mydt in mycast.keys():
-        lons.extend(mycast[mydt]["lon"])
-        lats.extend(mycast[mydt]["lat"])
-    lons = list(set(lons))
-    lats = list(set(lats))
-
-    fig, ax = plot_base(lons=lons, lats=lats, padding_percent=0.05)
+    if models is None:
+        models = get_available_models(storm_id, tropycal_forecasts, hafs_storms)
+    tracks = get_spaghetti_tracks(storm_id, tropycal_forecasts, hafs_storms, models)
+    if len(tracks) == 0:
+        raise ValueError(f"{storm_id} no spaghetti tracks for {models=}")
+
+    lons = np.concatenate([x[2] for x in tracks])
+    lats = np.concatenate([x[3] for x in tracks])
+    keep = ~(np.isnan(lons) | np.isnan(lats))
+
+    fig, ax = plot_base(
+        lons=lons[keep],
+        lats=lats[keep],
+        padding_percent=0.05,
+        render_profile=render_profile,
+    )
 
+    plotted_models = sorted({x[0] for x in tracks})
     ax.set_title(
-        f"MODEL: {my_model}, STORM: {storm_id}",
+        f"MODELS: {', '.join(plotted_models)}, STORM: {storm_id}",
         loc="left",
         fontweight="bold",
     )
 
-    unique_dates = sorted(
-        list(
-            {
-                (datetime.datetime.strptime(mydt, "%Y%m%d%H").date()).strftime(
-                    "%Y-%m-%d"
-                )
-                for mydt in mycast.keys()
-            }
-        )
+    # Project all points once, then split back into one segment per track
+    points = ax.projection.transform_points(ccrs.PlateCarree(), lons, lats)[:, :2]
+    offsets = np.cumsum([len(x[2]) for x in tracks])[:-1]
+    segments = np.split(points, offsets)
+    cycle_times = mdates.date2num([x[1] for x in tracks])
+
+    lines = LineCollection(
+        segments,
+        array=cycle_times,
+        cmap="inferno",  # You can also use 'plasma', 'magma', or 'viridis' here
+        linewidths=1,
     )
-    cmap = plt.get_cmap(
-        "inferno"
-    )  # You can also use 'plasma', 'magma', or 'viridis' here
-    norm = plt.Normalize(vmin=0, vmax=len(unique_dates) - 1)
-    date_to_color = {date: cmap(norm(index)) for index, date in enumerate(unique_dates)}
-
-    labeled = []
-    for mydt in mycast.keys():
-        mydatetime = datetime.datetime.strptime(mydt, "%Y%m%d%H")
-        my_date = (mydatetime.date()).strftime("%Y-%m-%d")
-        ax.plot(
-            mycast[mydt]["lon"],
-            mycast[mydt]["lat"],
-            transform=ccrs.PlateCarree(),
-            linewidth=1,
-            color=date_to_color[my_date],
-            label=my_date if my_date not in labeled else "_nolegend",
-        )
-        labeled.append(my_date)
+    ax.add_collection(lines)
+
+    colorbar = fig.colorbar(
+        lines, ax=ax, orientation="horizontal", shrink=0.7, pad=0.08
+    )
+    # Few enough cycle labels that they do not run into each other, 24 hourly
+    # covers the 2-3 day spans where days alone would be too few ticks
+    cycle_locator = mdates.AutoDateLocator(minticks=3, maxticks=6)
+    cycle_locator.intervald[mdates.HOURLY] = [1, 2, 3, 4, 6, 12, 24]
+    colorbar.ax.xaxis.set_major_locator(cycle_locator)
+    colorbar.ax.xaxis.set_major_formatter(mdates.DateFormatter("%m-%d %HZ"))
+    colorbar.ax.tick_params(labelsize=8)
 
-    ax.legend(loc="upper right", prop={"size": 10})
     ax.set_aspect("auto")
     fig.tight_layout()
-    fig.savefig(f"{my_dir}/{storm_id}/spaghetti.jpg")
+    save_figure(fig, f"{my_dir}/{storm_id}/spaghetti.jpg", render_profile)
     return fig
 
 
@@ -381,6 +542,8 @@ def plot_compare_forecasts(
     hafs_storms: StormForecasts,
     tropycal_forecasts: realtime.Realtime,
     my_dir: str,
+    storm_analytics: StormAnalytics | None = None,
+    render_profile: RenderProfile = DEFAULT_PROFILE,
     **kwargs: Any,
 ) -> plt.figure:
     tropycal_storm_df = tropycal_to_df(tropycal_hist)
@@ -392,19 +555,11 @@ def plot_compare_forecasts(
         x for x in my_storm_forecasts.forecasts if x.model_id == "HWRF"
     ][0].dataframe
 
-    forecast_lons = example_forecast["lon"].tolist()
-    forecast_lats = example_forecast["lat"].tolist()
-
-    lons = (
-        tropycal_storm_df[tropycal_storm_df["should_plot_step"]]["lon"].tolist()
-        + forecast_lons
-    )
-    lats = (
-        tropycal_storm_df[tropycal_storm_df["should_plot_step"]]["lat"].tolist()
-        + forecast_lats
-    )
+    plot_steps = tropycal_storm_df[tropycal_storm_df["should_plot_step"]]
+    lons = np.concatenate([plot_steps["lon"], example_forecast["lon"]])
+    lats = np.concatenate([plot_steps["lat"], example_forecast["lat"]])
 
-    fig, ax = plot_base(lons=lons, lats=lats)
+    fig, ax = plot_base(lons=lons, lats=lats, render_profile=render_profile)
 
     ax.set_title(
         "DEVELOPING STORM: " + tropycal_storm_df["name"].values[0],
@@ -471,15 +626,130 @@ def plot_compare_forecasts(
             zorder=1,
             label=model,
         )
+
+    # Consensus of all models
+    if storm_analytics is not None:
+        consensus = pd.DataFrame(
+            {"lat": storm_analytics.consensus_lat, "lon": storm_analytics.consensus_lon}
+        ).dropna()
+        ax.plot(
+            consensus["lon"],
+            consensus["lat"],
+            transform=ccrs.PlateCarree(),
+            linewidth=2,
+            linestyle="--",
+            color="k",
+            zorder=2,
+            label="Consensus",
+        )
     ax.legend(loc="upper right", prop={"size": 15})
     ax.set_aspect("auto")
     fig.tight_layout()
-    fig.savefig(f"{my_dir}/{storm_id}/compare.jpg")
+    save_figure(fig, f"{my_dir}/{storm_id}/compare.jpg", render_profile)
+    return fig
+
+
+def add_sshws_bands(ax: Axes, top: float) -> None:
+    """Shade each SSHWS band below top and label it to the right of the axes."""
+    highs = [x[1] for x in SSHWS_BANDS[1:]] + [np.inf]
+    for (label, low, color), high in zip(SSHWS_BANDS, highs, strict=True):
+        if low >= top:
+            break
+        high = min(high, top)
+        ax.axhspan(low, high, color=color, alpha=0.3, lw=0, zorder=0)
+        ax.text(
+            1.01,
+            (low + high) / 2,
+            label,
+            transform=ax.get_yaxis_transform(),
+            va="center",
+            fontsize=8,
+        )
+
+
+def plot_intensity(
+    storm_id: str,
+    tropycal_hist: realtime.storm,
+    tropycal_forecast: dict,
+    tropycal_forecasts: realtime.Realtime,
+    hafs_storms: StormForecasts,
+    my_dir: str,
+    storm_analytics: StormAnalytics | None = None,
+    render_profile: RenderProfile = DEFAULT_PROFILE,
+    **kwargs: Any,
+) -> plt.figure:
+    """Forecast wind by forecast hour per model over the SSHWS bands.
+
+    A plain chart with no map projection or Natural Earth data, it renders in
+    a fraction of the time of the map plots.
+    """
+    my_storm_forecasts = get_my_recent_forecasts(
+        storm_id, tropycal_forecasts=tropycal_forecasts, hafs_storms=hafs_storms
+    )
+
+    fig = plt.figure(dpi=render_profile.dpi, figsize=render_profile.figsize)
+    ax = fig.add_subplot()
+
+    winds = []
+    for mycast in my_storm_forecasts.forecasts:
+        if mycast.model_id not in my_models:
+            continue
+        storm_forecast = mycast.dataframe.dropna(subset=["fhr", "wind_kt"])
+        if storm_forecast.empty:
+            continue
+        ax.plot(
+            storm_forecast["fhr"],
+            storm_forecast["wind_kt"],
+            linewidth=1.5,
+            color=my_models[mycast.model_id]["color"],
+            zorder=2,
+            label=mycast.model_id,
+        )
+        winds.append(storm_forecast["wind_kt"].to_numpy(dtype=float))
+
+    if "vmax" in tropycal_forecast:
+        ax.plot(
+            tropycal_forecast["fhr"],
+            tropycal_forecast["vmax"],
+            linewidth=2.5,
+            color="k",
+            zorder=3,
+            label="Official",
+        )
+        winds.append(np.asarray(tropycal_forecast["vmax"], dtype=float))
+
+    if storm_analytics is not None:
+        ax.plot(
+            storm_analytics.fhr,
+            storm_analytics.consensus_wind_kt,
+            linewidth=2,
+            linestyle="--",
+            color="k",
+            zorder=3,
+            label="Consensus",
+        )
+
+    if len(winds) == 0:
+        raise ValueError(f"{storm_id} no forecast winds to plot")
+
+    top = max(np.nanmax(np.concatenate(winds)) + 15, 70)
+    add_sshws_bands(ax, top)
+    ax.set_ylim(0, top)
+    ax.set_xlim(left=0)
+    ax.set_xlabel("Forecast hour")
+    ax.set_ylabel("Max sustained wind (kt)")
+    ax.set_title(
+        f"INTENSITY: {tropycal_hist['name']}, STORM: {storm_id}",
+        loc="left",
+        fontweight="bold",
+    )
+    ax.grid(alpha=0.3)
+    ax.legend(loc="upper left", prop={"size": 8})
+    fig.tight_layout()
+    save_figure(fig, f"{my_dir}/{storm_id}/intensity.jpg", render_profile)
     return fig
 
 
-cone_color = "#fffde6"
-cone_color = "#e6f2ff"
 cone_color = "#fff8d5"
 water_color = "#d5f0ff"
 land_color = "#fcf3e8"
@@ -599,44 +869,3 @@ c5 = mlines.Line2D(
     marker="o",
     color=get_colors_sshws(137),
 )
-
-my_cone = {
-    0: 0,
-    12: 16,
-    24: 26,
-    36: 39,
-    48: 53,
-    60: 67,
-    72: 81,
-    96: 99,
-    108: 145,
-    120: 205,
-}
-
-my_models = {
-    "HWRF": {
-        "name": "Hurricane Weather Research and Forecasting Model",
-        "color": "#1f77b4",  # muted blue
-    },
-    "AVNO": {"name": "GFS", "color": "#ff7f0e"},  # safety orange
-    "CMC": {
-        "name": "Canadian Meteorological Centre",
-        "color": "#2ca02c",  # cooked asparagus green
-    },
-    "NVGM": {
-        "name": "NVGM",
-        "color": "#d62728",  # brick red
-    },
-    "ICON": {
-        "name": "Icosahedral Nonhydrostatic Model",
-        "color": "#9467bd",  # muted purple
-    },
-    "hfsa": {
-        "name": "HAFS 1a",
-        "color": "#e377c2",  # pink
-    },
-    "hfsb": {
-        "name": "HAFS 1b",
-        "color": "#bcbd22",  # yellowish-green
-    },
-}
@@ -0,0 +1,147 @@
+import cProfile
+import datetime
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any
+
+from config.config import PROFILE_DIR, PROFILE_SAMPLE_RATE
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Frames listed in each profile's text summary
+TOP_FRAMES = 30
+
+# Held while a request is profiled, by the middleware or a threaded handler
+_REQUEST_SAMPLE_LOCK = threading.Lock()
+
+
+def get_profile_base(name: str) -> str:
+    """Path without extension for a new profile, e.g. 20240802T061502_AL092024_compare."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    timestamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%dT%H%M%S%f")
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")
+    return f"{PROFILE_DIR}/{timestamp}_{safe_name}"
+
+
+def write_cprofile(profiler: cProfile.Profile, name: str) -> str:
+    """Save raw stats for snakeviz/pstats and a summary of the top frames."""
+    base = get_profile_base(name)
+    profiler.dump_stats(f"{base}.prof")
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    summary.write("Hot frames by own time\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FRAMES)
+    summary.write("Frames by cumulative time\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FRAMES)
+    with open(f"{base}.txt", "w") as file_w:
+        file_w.write(summary.getvalue())
+    return base
+
+
+@contextmanager
+def cprofiled(name: str) -> Iterator[None]:
+    """Deterministic cProfile of the block, saved under PROFILE_DIR."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        base = write_cprofile(profiler, name)
+        logger.info(f"profile {name} saved to {base}.txt")
+
+
+def start_sampling(async_mode: str = "enabled") -> Any:
+    """Start a sampling profiler, pyinstrument or cProfile if not installed.
+
+    Both only record the thread that started them. pyinstrument follows
+    awaits, so async request handlers are attributed correctly and its
+    overhead is low enough for live traffic. cProfile also records other
+    requests running on the event loop meanwhile.
+    """
+    if Profiler is None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    profiler = Profiler(async_mode=async_mode)
+    profiler.start()
+    return profiler
+
+
+def stop_sampling(profiler: Any) -> None:
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+
+
+def start_request_sample(async_mode: str = "enabled") -> Any | None:
+    """Profiler for a sample of requests, see PROFILE_SAMPLE_RATE.
+
+    None if this request is not sampled or another is being profiled.
+    """
+    if random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    if not _REQUEST_SAMPLE_LOCK.acquire(blocking=False):
+        return None
+    try:
+        return start_sampling(async_mode)
+    except Exception:
+        _REQUEST_SAMPLE_LOCK.release()
+        raise
+
+
+def stop_request_sample(profiler: Any) -> None:
+    try:
+        stop_sampling(profiler)
+    finally:
+        _REQUEST_SAMPLE_LOCK.release()
+
+
+def sampled_in_thread(func: Callable) -> Callable:
+    """Profile a sample of calls of a sync_to_thread request handler.
+
+    The handler runs on a worker thread the middleware's profiler does not
+    see, so it is profiled and saved from that thread.
+    """
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profiler = start_request_sample(async_mode="disabled")
+        if profiler is None:
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stop_request_sample(profiler)
+            save_sampled(profiler, f"api_{func.__name__}")
+
+    return wrapper
+
+
+def save_sampled(profiler: Any, name: str) -> str:
+    """Write a stopped sampling profile, slow enough to keep off the event loop."""
+    if isinstance(profiler, cProfile.Profile):
+        base = write_cprofile(profiler, name)
+    else:
+        base = get_profile_base(name)
+        with open(f"{base}.html", "w") as file_w:
+            file_w.write(profiler.output_html())
+        with open(f"{base}.txt", "w") as file_w:
+            file_w.write(profiler.output_text(unicode=False, color=False))
+    logger.info(f"profile {name} saved to {base}.txt")
+    return base
@@ -0,0 +1,262 @@
+import dataclasses
+import datetime
+import fcntl
+import gzip
+import json
+import logging
+import os
+import shutil
+from typing import Any
+
+from api_app.models import IMAGE_TYPES, Storm, Storms
+from catalog import get_basin, record_storm
+from config.config import IMAGES_DIR
+from notify import announce
+from tiles import remove_old_tiles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Renders are written here first, never under the served date directories
+STAGING_DIR = f"{IMAGES_DIR}/.staging"
+GENERATION_PATH = f"{IMAGES_DIR}/generation.json"
+GENERATION_LOCK = f"{IMAGES_DIR}/.generation.lock"
+# Precomputed GET /api/storms/ body, with .gz and .br encodings beside it
+STORMS_INDEX_PATH = f"{IMAGES_DIR}/storms.json"
+# Precomputed GET /api/storms/batch body, every storm's metadata and tracks
+BATCH_INDEX_PATH = f"{IMAGES_DIR}/batch.json"
+
+# Each storm dir is a symlink into versions kept under the date dir
+VERSIONS_DIR_NAME = ".versions"
+# Previous versions are kept so readers that resolved the old link can finish
+KEEP_VERSIONS = 2
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Write to a temp file in the same directory and rename over path."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as file_w:
+        file_w.write(data)
+        file_w.flush()
+        os.fsync(file_w.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_generation() -> int:
+    try:
+        with open(GENERATION_PATH) as file_r:
+            generation: int = json.load(file_r)["generation"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return 0
+    return generation
+
+
+def next_generation() -> int:
+    """Increment the published generation counter, safe across processes."""
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+    with open(GENERATION_LOCK, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        generation = read_generation() + 1
+        data = {
+            "generation": generation,
+            "updated_at": datetime.datetime.now(datetime.UTC).isoformat(),
+        }
+        atomic_write_bytes(GENERATION_PATH, json.dumps(data).encode("utf-8"))
+    return generation
+
+
+def get_staging_dir(date_str: str) -> str:
+    return f"{STAGING_DIR}/{date_str}"
+
+
+def prepare_staging(date_str: str, storm_id: str) -> str:
+    """Staging directory for a storm, seeded with a copy of its published files.
+
+    Copying (not linking) keeps files that this run does not re-render while
+    rewrites never touch the published inodes. Leftovers of a crashed run are
+    removed first.
+    """
+    storm_staging = f"{get_staging_dir(date_str)}/{storm_id}"
+    shutil.rmtree(storm_staging, ignore_errors=True)
+    published = f"{IMAGES_DIR}/{date_str}/{storm_id}"
+    if os.path.isdir(published):
+        shutil.copytree(published, storm_staging)
+    else:
+        os.makedirs(storm_staging)
+    return storm_staging
+
+
+def get_storm_version(date_str: str, storm_id: str) -> str | None:
+    """Published version name of a storm, e.g. AL092024.17.
+
+    None for storm directories written before versioned publishing.
+    """
+    try:
+        target = os.readlink(f"{IMAGES_DIR}/{date_str}/{storm_id}")
+    except OSError:
+        return None
+    return os.path.basename(target)
+
+
+def get_string_date_from_days_ago(days: int) -> str:
+    mydate = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    mydate_str = mydate.strftime("%Y-%m-%d")
+    return mydate_str
+
+
+def get_most_recent_storm_dirs() -> tuple[str, list[str]]:
+    storm_dirs: list = []
+    i = 0
+    while len(storm_dirs) == 0 and i <= 5:
+        date_str = get_string_date_from_days_ago(i)
+        if os.path.isdir(f"{IMAGES_DIR}/{date_str}"):
+            storm_dirs = [
+                x
+                for x in os.listdir(f"{IMAGES_DIR}/{date_str}")
+                if not x.startswith(".")
+            ]
+            logger.info(f"{date_str=} found {len(storm_dirs)} directories")
+        else:
+            logger.info(f"{date_str=} found no directories")
+        i += 1
+    return date_str, storm_dirs
+
+
+def load_storm_tracks(date_str: str, storm_id: str) -> dict[str, Any]:
+    """A published storm's tracks.json, empty if it has none."""
+    try:
+        with open(f"{IMAGES_DIR}/{date_str}/{storm_id}/tracks.json") as file_r:
+            return json.load(file_r)
+    except (FileNotFoundError, json.JSONDecodeError):
+        logger.warning(f"{storm_id} has no tracks.json")
+        return {}
+
+
+def build_storms_list() -> Storms:
+    """Most recent storms with their image types, update times, name and cycles."""
+    date_str, storm_dirs = get_most_recent_storm_dirs()
+    storms = []
+    for storm_id in sorted(storm_dirs):
+        storm_dir = f"{IMAGES_DIR}/{date_str}/{storm_id}"
+        files = {x.name: x.stat().st_mtime for x in os.scandir(storm_dir)}
+        image_types = [IMAGE_TYPES[x] for x in IMAGE_TYPES if x in files]
+        updated_at = None
+        if files:
+            updated_at = datetime.datetime.fromtimestamp(
+                max(files.values()), datetime.UTC
+            ).isoformat()
+        storm_tracks = load_storm_tracks(date_str, storm_id)
+        storms.append(
+            Storm(
+                id=storm_id,
+                date=date_str,
+                image_types=image_types,
+                updated_at=updated_at,
+                version=get_storm_version(date_str, storm_id),
+                name=storm_tracks.get("name"),
+                basin=get_basin(storm_id),
+                cycles={
+                    model_id: track["cycle"]
+                    for model_id, track in storm_tracks.get("forecasts", {}).items()
+                },
+            )
+        )
+    return Storms(storms=storms)
+
+
+def write_encoded(path: str, body: bytes) -> None:
+    """Write body in identity, gzip and brotli encodings."""
+    atomic_write_bytes(f"{path}.gz", gzip.compress(body, 9))
+    if brotli is not None:
+        atomic_write_bytes(f"{path}.br", brotli.compress(body))
+    elif os.path.exists(f"{path}.br"):
+        os.remove(f"{path}.br")
+    # Identity last, the API reloads all encodings when this file changes
+    atomic_write_bytes(path, body)
+
+
+def write_storms_index() -> Storms:
+    """Precompute the storms list body in identity, gzip and brotli encodings."""
+    storms = build_storms_list()
+    write_encoded(
+        STORMS_INDEX_PATH, json.dumps(dataclasses.asdict(storms)).encode("utf-8")
+    )
+    return storms
+
+
+def build_batch(storms: Storms) -> dict[str, Any]:
+    """Metadata and tracks.json of every listed storm in one document."""
+    batch = []
+    for storm in storms.storms:
+        storm_tracks = load_storm_tracks(storm.date, storm.id)
+        storm_tracks.pop("storm_id", None)
+        batch.append({**dataclasses.asdict(storm), **storm_tracks})
+    return {"storms": batch}
+
+
+def write_batch_index(storms: Storms) -> None:
+    body = json.dumps(build_batch(storms), separators=(",", ":")).encode("utf-8")
+    write_encoded(BATCH_INDEX_PATH, body)
+
+
+def publish_storm(date_str: str, storm_id: str) -> int:
+    """Publish a storm's staged image set with a single symlink swap.
+
+    The staged directory is renamed into a new version and the storm symlink is
+    atomically replaced, so the API sees either the whole old or whole new set.
+    """
+    storm_staging = f"{get_staging_dir(date_str)}/{storm_id}"
+    date_dir = f"{IMAGES_DIR}/{date_str}"
+    versions_dir = f"{date_dir}/{VERSIONS_DIR_NAME}"
+    os.makedirs(versions_dir, exist_ok=True)
+
+    storm_link = f"{date_dir}/{storm_id}"
+    if os.path.isdir(storm_link) and not os.path.islink(storm_link):
+        # One time migration of a storm directory from before versioning
+        os.rename(storm_link, f"{versions_dir}/{storm_id}.0")
+
+    generation = next_generation()
+    version = f"{storm_id}.{generation}"
+    os.rename(storm_staging, f"{versions_dir}/{version}")
+    try:
+        os.rmdir(get_staging_dir(date_str))
+    except OSError:
+        # Other storms of this date are still being rendered
+        pass
+
+    tmp_link = f"{date_dir}/.{storm_id}.tmp"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(f"{VERSIONS_DIR_NAME}/{version}", tmp_link)
+    os.replace(tmp_link, storm_link)
+    logger.info(f"{storm_id} published {version=}")
+    try:
+        record_storm(date_str, storm_id, version, f"{versions_dir}/{version}")
+    except Exception:
+        logger.exception(f"{storm_id} {version=} catalog failed")
+    try:
+        announce(date_str, storm_id, version, os.listdir(f"{versions_dir}/{version}"))
+    except Exception:
+        # The API notices the generation it was not told about and checks
+        # versions on every read until a later announce
+        logger.exception(f"{storm_id} {version=} announce failed")
+
+    remove_old_versions(versions_dir, storm_id)
+    remove_old_tiles(date_str, storm_id, version)
+    write_batch_index(write_storms_index())
+    return generation
+
+
+def remove_old_versions(versions_dir: str, storm_id: str) -> None:
+    versions = []
+    for name in os.listdir(versions_dir):
+        prefix, _, generation = name.rpartition(".")
+        if prefix == storm_id and generation.isdigit():
+            versions.append((int(generation), name))
+    for _, name in sorted(versions)[:-KEEP_VERSIONS]:
+        shutil.rmtree(f"{versions_dir}/{name}", ignore_errors=True)
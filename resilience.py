@@ -0,0 +1,203 @@
+import logging
+import random
+import socket
+import threading
+import time
+import urllib.error
+from typing import Any, Callable, TypeVar
+from urllib.parse import urlparse
+
+import requests
+
+from config.config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    RETRY_BUDGET,
+    RETRY_COUNT,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+# Status codes worth retrying, anything else is returned to the caller
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class SourceUnavailableError(Exception):
+    """Raised without trying when a source's circuit breaker is open."""
+
+
+class RetryableStatusError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, lets one trial call through after a cool down."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                # Half open, the next result decides
+                self.opened_at = None
+                self.failures = self.failure_threshold - 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold and self.opened_at is None:
+                logger.warning(f"circuit breaker {self.name} open")
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Retries shared by every source for the whole run, None is unlimited."""
+
+    def __init__(self, total: int | None = RETRY_BUDGET) -> None:
+        self.remaining = total
+        self.lock = threading.Lock()
+
+    def reset(self, total: int | None) -> None:
+        with self.lock:
+            self.remaining = total
+
+    def take(self) -> bool:
+        with self.lock:
+            if self.remaining is None:
+                return True
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+retry_budget = RetryBudget()
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+# Sessions are not thread safe, keep one per download thread
+_sessions = threading.local()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def get_session() -> requests.Session:
+    if not hasattr(_sessions, "session"):
+        _sessions.session = requests.Session()
+    session: requests.Session = _sessions.session
+    return session
+
+
+def configure_default_timeout(seconds: float = READ_TIMEOUT) -> None:
+    """Socket timeout for libraries that do not take one, such as tropycal."""
+    socket.setdefaulttimeout(seconds)
+
+
+def backoff_seconds(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Full jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def is_transient(e: BaseException) -> bool:
+    """Connection problems, timeouts and 5xx/429 responses, worth retrying."""
+    if isinstance(
+        e,
+        (
+            RetryableStatusError,
+            requests.ConnectionError,
+            requests.Timeout,
+            ConnectionError,
+            TimeoutError,
+        ),
+    ):
+        return True
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code in RETRY_STATUS
+    if isinstance(e, urllib.error.HTTPError):
+        return e.code in RETRY_STATUS
+    # tropycal downloads with urllib, URLError wraps its connection errors
+    return isinstance(e, urllib.error.URLError)
+
+
+def call(
+    source: str,
+    func: Callable[..., T],
+    *args: Any,
+    retries: int = RETRY_COUNT,
+    **kwargs: Any,
+) -> T:
+    """Call func through the source's circuit breaker, retrying with backoff.
+
+    Only transient errors are retried and count against the breaker, anything
+    else (a parse error, a storm without forecasts) is raised straight away.
+    """
+    breaker = get_breaker(source)
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise SourceUnavailableError(f"{source} circuit breaker is open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            breaker.record_failure()
+            if attempt >= retries or not retry_budget.take():
+                raise
+            sleep = backoff_seconds(attempt)
+            logger.warning(
+                f"{source} attempt {attempt} failed: {e}, retry {sleep=:.1f}"
+            )
+            time.sleep(sleep)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+def get(url: str, retries: int = RETRY_COUNT, **kwargs: Any) -> requests.Response:
+    """requests.get with timeouts, retries and a circuit breaker per host.
+
+    Client errors such as 404 are returned as is, only connection problems,
+    timeouts and 5xx/429 responses count as failures.
+    """
+
+    def _get() -> requests.Response:
+        response = get_session().get(
+            url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs
+        )
+        if response.status_code in RETRY_STATUS:
+            response.close()
+            raise RetryableStatusError(f"{response.status_code} for {url}")
+        return response
+
+    return call(urlparse(url).netloc, _get, retries=retries)
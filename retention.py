@@ -0,0 +1,186 @@
+import datetime
+import json
+import logging
+import os
+import shutil
+import struct
+import zipfile
+
+from catalog import remove_date
+from config.config import (
+    ANALYTICS_DIR,
+    ARCHIVE_DIR,
+    CONE_DIR,
+    HOT_DAYS,
+    IMAGES_DIR,
+    RETENTION_DAYS,
+    TILES_DIR,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Size of the fixed part of a zip local file header
+ZIP_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+
+_INDEX_CACHE: dict[str, dict[str, list[int]]] = {}
+
+
+def get_date_dirs(images_dir: str = IMAGES_DIR) -> dict[datetime.date, str]:
+    """Date directories under images_dir, other entries are ignored."""
+    date_dirs = {}
+    if not os.path.isdir(images_dir):
+        return date_dirs
+    for name in os.listdir(images_dir):
+        try:
+            mydate = datetime.datetime.strptime(name, "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        date_dirs[mydate] = f"{images_dir}/{name}"
+    return date_dirs
+
+
+def archive_path(date_str: str) -> str:
+    return f"{ARCHIVE_DIR}/{date_str}.zip"
+
+
+def index_path(date_str: str) -> str:
+    return f"{ARCHIVE_DIR}/{date_str}.index.json"
+
+
+def build_index(zip_path: str) -> dict[str, list[int]]:
+    """Map each member to the [offset, size] of its raw bytes in the zip.
+
+    Members are stored uncompressed so a reader can seek and read them directly.
+    """
+    index = {}
+    with zipfile.ZipFile(zip_path) as myzip, open(zip_path, "rb") as file_r:
+        for info in myzip.infolist():
+            file_r.seek(info.header_offset)
+            header = ZIP_LOCAL_HEADER.unpack(file_r.read(ZIP_LOCAL_HEADER.size))
+            name_len, extra_len = header[9], header[10]
+            offset = info.header_offset + ZIP_LOCAL_HEADER.size + name_len + extra_len
+            index[info.filename] = [offset, info.file_size]
+    return index
+
+
+def archive_day(date_str: str, day_dir: str) -> None:
+    """Pack one day of images into a stored zip plus offset index, then delete it."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    zip_path = archive_path(date_str)
+    tmp_zip = f"{zip_path}.tmp"
+    with zipfile.ZipFile(tmp_zip, "w", compression=zipfile.ZIP_STORED) as myzip:
+        for root, dirs, files in os.walk(day_dir, followlinks=True):
+            # Storm links are followed, the version dirs behind them are skipped
+            dirs[:] = [x for x in dirs if not x.startswith(".")]
+            for filename in sorted(files):
+                full_path = f"{root}/{filename}"
+                myzip.write(full_path, arcname=os.path.relpath(full_path, day_dir))
+
+    index = build_index(tmp_zip)
+    tmp_index = f"{index_path(date_str)}.tmp"
+    with open(tmp_index, "w") as file_w:
+        json.dump(index, file_w)
+    # Zip first, the API only trusts an archive once its index exists
+    os.replace(tmp_zip, zip_path)
+    os.replace(tmp_index, index_path(date_str))
+    shutil.rmtree(day_dir)
+    logger.info(f"archived {date_str} {len(index)} files")
+
+
+def prune_cache_dir(cache_dir: str, cutoff: datetime.date) -> None:
+    """Delete cache files last written before cutoff, one is added per cycle."""
+    if not os.path.isdir(cache_dir):
+        return
+    removed = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file():
+            continue
+        modified = datetime.datetime.fromtimestamp(
+            entry.stat().st_mtime, datetime.UTC
+        ).date()
+        if modified < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    if removed:
+        logger.info(f"pruned {removed} files from {cache_dir}")
+
+
+def apply_retention(
+    today: datetime.date | None = None,
+    hot_days: int = HOT_DAYS,
+    retention_days: int = RETENTION_DAYS,
+) -> None:
+    """Keep hot days as files, archive older days and delete past the horizon."""
+    if today is None:
+        today = datetime.datetime.now(datetime.UTC).date()
+    hot_cutoff = today - datetime.timedelta(days=hot_days)
+    delete_cutoff = today - datetime.timedelta(days=retention_days)
+
+    for mydate, day_dir in sorted(get_date_dirs().items()):
+        date_str = mydate.strftime("%Y-%m-%d")
+        if mydate < delete_cutoff:
+            logger.info(f"delete {date_str} past retention")
+            shutil.rmtree(day_dir)
+            remove_date(date_str)
+        elif mydate < hot_cutoff:
+            archive_day(date_str, day_dir)
+
+    # Cached analytics and cones are only reused while their cycle is current
+    for cache_dir in [ANALYTICS_DIR, CONE_DIR]:
+        prune_cache_dir(cache_dir, hot_cutoff)
+
+    # Archived days are not tiled, their tiles would only be served stale
+    for mydate, tiles_dir in get_date_dirs(TILES_DIR).items():
+        if mydate < hot_cutoff:
+            shutil.rmtree(tiles_dir, ignore_errors=True)
+
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    for name in os.listdir(ARCHIVE_DIR):
+        try:
+            mydate = datetime.datetime.strptime(name[:10], "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        if mydate < delete_cutoff:
+            logger.info(f"delete archive {name} past retention")
+            os.remove(f"{ARCHIVE_DIR}/{name}")
+            _INDEX_CACHE.pop(name[:10], None)
+            remove_date(name[:10])
+
+
+def load_index(date_str: str) -> dict[str, list[int]] | None:
+    """Archive index for a day, indexes never change once written."""
+    if date_str in _INDEX_CACHE:
+        return _INDEX_CACHE[date_str]
+    try:
+        with open(index_path(date_str)) as file_r:
+            index: dict[str, list[int]] = json.load(file_r)
+    except FileNotFoundError:
+        return None
+    _INDEX_CACHE[date_str] = index
+    return index
+
+
+def read_archived_file(date_str: str, storm_id: str, filename: str) -> bytes | None:
+    """Range read one file out of a day archive, None if it was not archived."""
+    index = load_index(date_str)
+    if index is None:
+        return None
+    member = index.get(f"{storm_id}/{filename}")
+    if member is None:
+        return None
+    offset, size = member
+    try:
+        with open(archive_path(date_str), "rb") as file_r:
+            file_r.seek(offset)
+            return file_r.read(size)
+    except FileNotFoundError:
+        # Deleted past retention by the scraper, this process still had its index
+        _INDEX_CACHE.pop(date_str, None)
+        return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig()
+    apply_retention()
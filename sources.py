@@ -0,0 +1,245 @@
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
+from typing import Any
+
+from tropycal import realtime
+
+import atcf
+import hafs
+import resilience
+from config.config import FORECAST_SOURCES, HAFS_MODELS
+from models import StormForecast, StormForecasts
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# get_data name for all FORECAST_SOURCES merged into one StormForecasts
+FORECASTS_GROUP = "model_forecasts"
+
+
+def combine_forecasts(results: list[Any]) -> StormForecasts:
+    """Merge parsed StormForecast and StormForecasts results into one."""
+    forecasts = []
+    for result in results:
+        if isinstance(result, StormForecast):
+            forecasts.append(result)
+        else:
+            forecasts.extend(result.forecasts)
+    return StormForecasts(forecasts=forecasts)
+
+
+def combine_single(results: list[Any]) -> Any:
+    return results[0]
+
+
+@dataclass
+class Source:
+    """A data source the scraper downloads each run.
+
+    discover lists units of work for the newest available data, e.g. one per
+    storm file, and parse downloads and parses one unit. The context is what
+    the caller passes to fetch, such as a tropycal storm.
+    """
+
+    name: str
+    discover: Callable[[Any], list[Any]]
+    parse: Callable[[Any], Any]
+    combine: Callable[[list[Any]], Any] = combine_forecasts
+    # Concurrent parse calls, across all runs of the scheduler
+    max_workers: int = 2
+    # Retries of resilience.call around parse, 0 when parse uses resilience.get
+    retries: int = 0
+
+    def __post_init__(self) -> None:
+        self.limit = threading.Semaphore(self.max_workers)
+
+
+SOURCES: dict[str, Source] = {}
+
+
+def register(source: Source) -> Source:
+    SOURCES[source.name] = source
+    return source
+
+
+def get_source(data_type: str) -> Source:
+    """Source for a data type, per storm types carry a suffix: tropycal_models_AL092024."""
+    if data_type in SOURCES:
+        return SOURCES[data_type]
+    matches = [x for x in SOURCES if data_type.startswith(f"{x}_")]
+    if not matches:
+        raise KeyError(f"no source registered for {data_type=}")
+    return SOURCES[max(matches, key=len)]
+
+
+def _run_limited(source: Source, func: Callable[..., Any], *args: Any) -> Any:
+    with source.limit:
+        return func(*args)
+
+
+def _parse(source: Source, unit: Any) -> Any:
+    with source.limit:
+        return resilience.call(source.name, source.parse, unit, retries=source.retries)
+
+
+def fetch_sources(
+    names: list[str], context: Any = None, max_workers: int = 8
+) -> dict[str, Any]:
+    """Discover and parse the named sources together on one shared pool.
+
+    A source's units are only submitted while it has fewer than max_workers
+    calls running, so a slow source cannot hold every thread and the others
+    keep being scheduled. Units that fail are logged and skipped. A source
+    whose discovery fails, or whose every unit failed, maps to the exception
+    instead of a result. Discovering no units is a result: nothing is out.
+    """
+    results: dict[str, Any] = {}
+    # Units not submitted yet, as (index, unit) so results keep their order
+    pending: dict[str, deque[tuple[int, Any]]] = {}
+    parsed: dict[str, dict[int, Any]] = {}
+    unit_counts: dict[str, int] = {}
+    running: dict[str, int] = {name: 0 for name in names}
+    # future -> (source name, unit index), index None for discovery
+    futures: dict[Future, tuple[str, int | None]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for name in names:
+            source = SOURCES[name]
+            future = executor.submit(_run_limited, source, source.discover, context)
+            futures[future] = (name, None)
+            running[name] += 1
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, index = futures.pop(future)
+                source = SOURCES[name]
+                running[name] -= 1
+                if index is None:
+                    try:
+                        units = future.result()
+                    except Exception as e:
+                        logger.warning(f"source {name} discovery failed: {e}")
+                        results[name] = e
+                        continue
+                    pending[name] = deque(enumerate(units))
+                    unit_counts[name] = len(units)
+                    parsed[name] = {}
+                else:
+                    try:
+                        parsed[name][index] = future.result()
+                    except Exception as e:
+                        logger.warning(f"source {name} parse failed: {e}")
+                while pending[name] and running[name] < source.max_workers:
+                    unit_index, unit = pending[name].popleft()
+                    futures[executor.submit(_parse, source, unit)] = (name, unit_index)
+                    running[name] += 1
+
+    for name, name_parsed in parsed.items():
+        logger.info(f"source {name} parsed {len(name_parsed)}/{unit_counts[name]}")
+        if name_parsed or unit_counts[name] == 0:
+            results[name] = SOURCES[name].combine(
+                [name_parsed[x] for x in sorted(name_parsed)]
+            )
+        else:
+            results[name] = ValueError(f"source {name} returned no data")
+    return results
+
+
+def fetch(data_type: str, context: Any = None) -> Any:
+    """Download one data type, raising if it could not be fetched.
+
+    FORECASTS_GROUP fetches every FORECAST_SOURCES source together and merges
+    what succeeded. It only fails when every source failed, sources that have
+    no storms right now give an empty StormForecasts.
+    """
+    if data_type == FORECASTS_GROUP:
+        results = fetch_sources(FORECAST_SOURCES, context)
+        succeeded = [x for x in results.values() if isinstance(x, StormForecasts)]
+        if len(succeeded) == 0:
+            raise ValueError(f"every source of {FORECAST_SOURCES} failed")
+        return combine_forecasts(succeeded)
+
+    source = get_source(data_type)
+    result = fetch_sources([source.name], context)[source.name]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def get_tropycal_realtime(unit: Any) -> realtime.Realtime:
+    return realtime.Realtime(jtwc=True, jtwc_source="ucar")
+
+
+def get_tropycal_official(tropycal_hist: realtime.storm) -> dict:
+    return tropycal_hist.get_forecast_realtime(ssl_certificate="/usr/lib/ssl/cert.pem")
+
+
+def get_tropycal_models(tropycal_hist: realtime.storm) -> dict:
+    return tropycal_hist.get_operational_forecasts()
+
+
+def discover_context(context: Any) -> list[Any]:
+    """The caller's context is the only unit, e.g. one tropycal storm."""
+    return [context]
+
+
+register(
+    Source(
+        name="tropycal_realtime",
+        discover=discover_context,
+        parse=get_tropycal_realtime,
+        combine=combine_single,
+        max_workers=1,
+        retries=1,
+    )
+)
+register(
+    Source(
+        name="tropycal_official",
+        discover=discover_context,
+        parse=get_tropycal_official,
+        combine=combine_single,
+        max_workers=4,
+        retries=3,
+    )
+)
+register(
+    Source(
+        name="tropycal_models",
+        discover=discover_context,
+        parse=get_tropycal_models,
+        combine=combine_single,
+        max_workers=4,
+        retries=3,
+    )
+)
+for model in HAFS_MODELS:
+    register(
+        Source(
+            name=f"hafs_{model}",
+            discover=partial(hafs.discover_latest_cycle, model),
+            parse=hafs.parse_storm_file,
+            max_workers=4,
+        )
+    )
+register(
+    Source(
+        name="atcf_adeck",
+        discover=partial(atcf.discover_decks, "a"),
+        parse=atcf.parse_adeck,
+        max_workers=4,
+    )
+)
+register(
+    Source(
+        name="atcf_bdeck",
+        discover=partial(atcf.discover_decks, "b"),
+        parse=atcf.parse_bdeck,
+        max_workers=4,
+    )
+)
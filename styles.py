@@ -0,0 +1,90 @@
+from models import RenderProfile
+
+# Label, lower bound in knots and color of each SSHWS band, below TD is white
+SSHWS_BANDS = [
+    ("TD", 5, "#8FC2F2"),  # '#7DB7ED'
+    ("TS", 34, "#3185D3"),
+    ("C1", 64, "#FFFF00"),
+    ("C2", 83, "#FF9E00"),
+    ("C3", 96, "#DD0000"),
+    ("C4", 113, "#FF00FC"),
+    ("C5", 137, "#8B0088"),
+]
+
+
+def get_colors_sshws(wind_speed: int) -> str:
+    r"""
+    Retrieve the default colors for the Saffir-Simpson Hurricane Wind Scale (SSHWS).
+
+    Parameters
+    ----------
+    wind_speed : int or list
+        Sustained wind speed in knots.
+
+    Returns
+    -------
+    str
+        Hex string for the corresponding color.
+    """
+
+    # # If category string passed, convert to wind
+    # if isinstance(wind_speed, str):
+    #     wind_speed = category_label_to_wind(wind_speed)
+
+    # Return default SSHWS category color scale
+    color = "#FFFFFF"
+    for _, low, band_color in SSHWS_BANDS:
+        if wind_speed >= low:
+            color = band_color
+    return color
+
+
+my_models = {
+    "HWRF": {
+        "name": "Hurricane Weather Research and Forecasting Model",
+        "color": "#1f77b4",  # muted blue
+    },
+    "AVNO": {"name": "GFS", "color": "#ff7f0e"},  # safety orange
+    "CMC": {
+        "name": "Canadian Meteorological Centre",
+        "color": "#2ca02c",  # cooked asparagus green
+    },
+    "NVGM": {
+        "name": "NVGM",
+        "color": "#d62728",  # brick red
+    },
+    "ICON": {
+        "name": "Icosahedral Nonhydrostatic Model",
+        "color": "#9467bd",  # muted purple
+    },
+    "hfsa": {
+        "name": "HAFS 1a",
+        "color": "#e377c2",  # pink
+    },
+    "hfsb": {
+        "name": "HAFS 1b",
+        "color": "#bcbd22",  # yellowish-green
+    },
+}
+
+
+# Named output settings, "standard" matches the images served before profiles
+RENDER_PROFILES = {
+    "draft": RenderProfile(
+        name="draft",
+        dpi=100,
+        figsize=(6.4, 4.8),
+        quality=60,
+        scale="110m",
+        antialias=False,
+    ),
+    "mobile": RenderProfile(
+        name="mobile", dpi=200, figsize=(6.4, 4.8), quality=80, scale="50m"
+    ),
+    "standard": RenderProfile(
+        name="standard", dpi=400, figsize=(6.4, 4.8), quality=75, scale="50m"
+    ),
+    "print": RenderProfile(
+        name="print", dpi=400, figsize=(9.6, 7.2), quality=95, scale="10m"
+    ),
+}
@@ -0,0 +1,212 @@
+import io
+import os
+import shutil
+from typing import Any
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
+
+from config.config import TILES_DIR
+from geo import unwrap_lon
+from styles import get_colors_sshws, my_models
+
+TILE_SIZE = 256
+MAX_ZOOM = 12
+# Half the width of the Web Mercator world in meters
+ORIGIN = 20037508.342789244
+MAX_LAT = 85.0511
+# Pixels of slack around a tile so markers and lines crossing its edge are drawn
+EDGE_PIXELS = 8
+
+_EMPTY_TILE: bytes | None = None
+
+
+def lonlat_to_mercator(
+    lons: np.ndarray, lats: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    lons = np.asarray(lons, dtype=float)
+    lats = np.clip(np.asarray(lats, dtype=float), -MAX_LAT, MAX_LAT)
+    x = np.deg2rad(lons) * ORIGIN / np.pi
+    y = np.log(np.tan(np.pi / 4 + np.deg2rad(lats) / 2)) * ORIGIN / np.pi
+    return x, y
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(xmin, ymin, xmax, ymax) in Web Mercator meters of an XYZ tile."""
+    size = 2 * ORIGIN / 2**z
+    xmin = -ORIGIN + x * size
+    ymax = ORIGIN - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def _unwrapped(track: dict[str, Any]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Mercator x, y of the points with a position, and the mask of those points."""
+    lons = np.asarray(track["lon"], dtype=float)
+    lats = np.asarray(track["lat"], dtype=float)
+    keep = ~(np.isnan(lons) | np.isnan(lats))
+    lons, lats = lons[keep], lats[keep]
+    x, y = lonlat_to_mercator(unwrap_lon(lons), lats)
+    return x, y, keep
+
+
+def get_layers(
+    storm_tracks: dict[str, Any], cone: dict[str, Any] | None
+) -> list[tuple[str, np.ndarray, np.ndarray, dict[str, Any]]]:
+    """Everything drawn on a tile as (kind, x, y, style) in mercator meters."""
+    layers = []
+    if cone is not None:
+        geometry = cone["geometry"]
+        polygons = geometry["coordinates"]
+        if geometry["type"] == "Polygon":
+            polygons = [polygons]
+        for polygon in polygons:
+            if len(polygon) == 0:
+                continue
+            ring = np.asarray(polygon[0], dtype=float)
+            x, y = lonlat_to_mercator(ring[:, 0], ring[:, 1])
+            layers.append(("cone", x, y, {}))
+
+    for model_id, track in storm_tracks["forecasts"].items():
+        if model_id not in my_models:
+            continue
+        x, y, _ = _unwrapped(track)
+        layers.append(("line", x, y, {"color": my_models[model_id]["color"]}))
+
+    x, y, _ = _unwrapped(storm_tracks["official"])
+    layers.append(("line", x, y, {"color": "k", "linewidth": 1.5}))
+
+    history = storm_tracks["history"]
+    x, y, keep = _unwrapped(history)
+    winds = np.nan_to_num(np.asarray(history["vmax"], dtype=float))[keep]
+    layers.append(("line", x, y, {"color": "gray"}))
+    layers.append(("dots", x, y, {"color": [get_colors_sshws(w) for w in winds]}))
+    return layers
+
+
+def empty_tile() -> bytes:
+    global _EMPTY_TILE
+    if _EMPTY_TILE is None:
+        _EMPTY_TILE = render_layers([], tile_bounds(0, 0, 0))
+    return _EMPTY_TILE
+
+
+def render_layers(
+    layers: list[tuple[str, np.ndarray, np.ndarray, dict[str, Any]]],
+    bounds: tuple[float, float, float, float],
+) -> bytes:
+    """Draw layers onto a transparent PNG tile, no map projection involved."""
+    xmin, ymin, xmax, ymax = bounds
+    fig = Figure(figsize=(TILE_SIZE / 100, TILE_SIZE / 100), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
+
+    # Draw copies a world width either side so tracks crossing 180 show up
+    for shift in (-2 * ORIGIN, 0, 2 * ORIGIN):
+        lines = []
+        colors = []
+        widths = []
+        for kind, x, y, style in layers:
+            if kind == "cone":
+                ax.add_patch(
+                    Polygon(
+                        np.column_stack([x + shift, y]),
+                        facecolor="#fff8d5",
+                        edgecolor="gray",
+                        linewidth=0.5,
+                        alpha=0.6,
+                        zorder=0,
+                    )
+                )
+            elif kind == "line":
+                lines.append(np.column_stack([x + shift, y]))
+                colors.append(style["color"])
+                widths.append(style.get("linewidth", 1))
+            elif kind == "dots":
+                ax.scatter(x + shift, y, c=style["color"], s=12, zorder=3)
+        if lines:
+            ax.add_collection(
+                LineCollection(lines, colors=colors, linewidths=widths, zorder=2)
+            )
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", transparent=True, dpi=100)
+    return buffer.getvalue()
+
+
+def layers_touch_tile(
+    layers: list[tuple[str, np.ndarray, np.ndarray, dict[str, Any]]],
+    bounds: tuple[float, float, float, float],
+) -> bool:
+    xmin, ymin, xmax, ymax = bounds
+    margin = (xmax - xmin) * EDGE_PIXELS / TILE_SIZE
+    for _, x, y, _ in layers:
+        if len(x) == 0:
+            continue
+        for shift in (-2 * ORIGIN, 0, 2 * ORIGIN):
+            if (
+                x.min() + shift <= xmax + margin
+                and x.max() + shift >= xmin - margin
+                and y.min() <= ymax + margin
+                and y.max() >= ymin - margin
+            ):
+                return True
+    return False
+
+
+def tile_path(
+    date_str: str, storm_id: str, version: str, z: int, x: int, y: int
+) -> str:
+    return f"{TILES_DIR}/{date_str}/{storm_id}/{version}/{z}/{x}/{y}.png"
+
+
+def get_tile(
+    date_str: str,
+    storm_id: str,
+    version: str,
+    storm_tracks: dict[str, Any],
+    cone: dict[str, Any] | None,
+    z: int,
+    x: int,
+    y: int,
+) -> bytes:
+    """Track overlay tile, rendered on first request and cached on disk."""
+    path = tile_path(date_str, storm_id, version, z, x, y)
+    try:
+        with open(path, "rb") as file_r:
+            return file_r.read()
+    except FileNotFoundError:
+        pass
+
+    bounds = tile_bounds(z, x, y)
+    layers = get_layers(storm_tracks, cone)
+    if not layers_touch_tile(layers, bounds):
+        # Most tiles of the world are empty, skip rendering and caching them
+        return empty_tile()
+
+    data = render_layers(layers, bounds)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{id(data)}"
+    with open(tmp_path, "wb") as file_w:
+        file_w.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+
+def remove_old_tiles(date_str: str, storm_id: str, version: str) -> None:
+    """Drop the tiles of a storm's superseded versions, only the current is served."""
+    storm_dir = f"{TILES_DIR}/{date_str}/{storm_id}"
+    if not os.path.isdir(storm_dir):
+        return
+    for name in os.listdir(storm_dir):
+        if name != version:
+            shutil.rmtree(f"{storm_dir}/{name}", ignore_errors=True)
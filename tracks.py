@@ -0,0 +1,127 @@
+import json
+import logging
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from tropycal import realtime
+
+from analytics import forecast_init
+from models import StormAnalytics, StormForecasts
+from plot import get_my_recent_forecasts, tropycal_to_df
+from styles import SSHWS_BANDS, my_models
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def _packed(values: Any) -> list:
+    """Column as a JSON friendly list, NaN becomes None."""
+    return [
+        None if pd.isna(x) else round(float(x), 2) for x in np.asarray(values).ravel()
+    ]
+
+
+def build_storm_tracks(
+    storm_id: str,
+    tropycal_hist: realtime.storm,
+    tropycal_forecast: dict,
+    tropycal_forecasts: dict,
+    hafs_storms: StormForecasts,
+) -> dict[str, Any]:
+    """Observed history and latest track per model as packed arrays.
+
+    Arrays are per column rather than per point so clients and the tile
+    renderer can use them directly.
+    """
+    storm_df = tropycal_to_df(tropycal_hist)
+    forecasts = {}
+    for forecast in get_my_recent_forecasts(
+        storm_id, tropycal_forecasts=tropycal_forecasts, hafs_storms=hafs_storms
+    ).forecasts:
+        df = forecast.dataframe
+        forecasts[forecast.model_id] = {
+            "cycle": forecast_init(forecast).strftime("%Y%m%d%H"),
+            "fhr": _packed(df["fhr"]),
+            "lat": _packed(df["lat"]),
+            "lon": _packed(df["lon"]),
+            "wind_kt": _packed(df["wind_kt"]),
+        }
+    return {
+        "storm_id": storm_id,
+        "name": str(storm_df["name"].values[0]),
+        "history": {
+            "time": [x.isoformat() for x in storm_df["time"]],
+            "lat": _packed(storm_df["lat"]),
+            "lon": _packed(storm_df["lon"]),
+            "vmax": _packed(storm_df["vmax"]),
+        },
+        "official": {
+            "cycle": tropycal_forecast["init"].strftime("%Y%m%d%H"),
+            "fhr": _packed(tropycal_forecast["fhr"]),
+            "lat": _packed(tropycal_forecast["lat"]),
+            "lon": _packed(tropycal_forecast["lon"]),
+            "wind_kt": _packed(tropycal_forecast["vmax"]),
+        },
+        "forecasts": forecasts,
+    }
+
+
+def build_storm_intensity(
+    storm_tracks: dict[str, Any], storm_analytics: StormAnalytics | None = None
+) -> dict[str, Any]:
+    """Wind by forecast hour per model from the tracks, the data of intensity.jpg.
+
+    Like the chart only models in my_models are included, consensus is None
+    without analytics.
+    """
+    consensus = None
+    if storm_analytics is not None:
+        consensus = {
+            "cycle": storm_analytics.cycle,
+            "fhr": list(storm_analytics.fhr),
+            "wind_kt": _packed(
+                np.asarray(storm_analytics.consensus_wind_kt, dtype=float)
+            ),
+        }
+    return {
+        "storm_id": storm_tracks["storm_id"],
+        "name": storm_tracks["name"],
+        "bands": [
+            {"label": label, "min_kt": low, "color": color}
+            for label, low, color in SSHWS_BANDS
+        ],
+        "history": {
+            "time": storm_tracks["history"]["time"],
+            "vmax": storm_tracks["history"]["vmax"],
+        },
+        "official": {
+            x: storm_tracks["official"][x] for x in ["cycle", "fhr", "wind_kt"]
+        },
+        "forecasts": {
+            model_id: {x: track[x] for x in ["cycle", "fhr", "wind_kt"]}
+            for model_id, track in storm_tracks["forecasts"].items()
+            if model_id in my_models
+        },
+        "consensus": consensus,
+    }
+
+
+def write_tracks(
+    my_dir: str,
+    storm_id: str,
+    tropycal_hist: realtime.storm,
+    tropycal_forecast: dict,
+    tropycal_forecasts: dict,
+    hafs_storms: StormForecasts,
+    storm_analytics: StormAnalytics | None = None,
+    **kwargs: Any,
+) -> None:
+    """Save a storm's track and intensity data next to its images for the API."""
+    storm_tracks = build_storm_tracks(
+        storm_id, tropycal_hist, tropycal_forecast, tropycal_forecasts, hafs_storms
+    )
+    with open(f"{my_dir}/{storm_id}/tracks.json", "w") as file_w:
+        json.dump(storm_tracks, file_w)
+    with open(f"{my_dir}/{storm_id}/intensity.json", "w") as file_w:
+        json.dump(build_storm_intensity(storm_tracks, storm_analytics), file_w)